@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -130,5 +131,38 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
-    ]
-}
\ No newline at end of file
+    ],
+    # same bytes as rest_framework.renderers.JSONRenderer, encoded with orjson when available;
+    # MessagePack/CBOR only for clients asking for them, JSON stays the default
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        *(['api.renderers.CBORRenderer'] if find_spec('cbor2') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        *(['api.parsers.MessagePackParser'] if find_spec('msgpack') else []),
+        *(['api.parsers.CBORParser'] if find_spec('cbor2') else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Largest JSON array accepted by the /api/books/bulk/* endpoints
+BOOK_BULK_MAX_ITEMS = 1000
+
+# Most ids looked up by one /api/books/batch/ request
+BOOK_BATCH_MAX_IDS = 100
+
+# Response cache of /api/books/, see api/cache.py
+BOOK_LIST_CACHE = {
+    'TIMEOUT': 60,       # seconds a cached list is served
+    'WAIT_TIMEOUT': 5,   # identical misses wait this long for the first one
+}
+
+# Feed imports (POST /api/books/import/), see api/importer.py
+BOOK_IMPORT_CHUNK_SIZE = 1000  # records per transaction
+BOOK_IMPORT_WORKERS = 2        # parser processes of in-request imports, 0 to parse in the request
+BOOK_IMPORT_DIR = BASE_DIR / 'imports'  # uploaded feeds waiting for import_books --queued
+BOOK_IMPORT_SYNC = False       # import in the request instead of queueing; for tests only
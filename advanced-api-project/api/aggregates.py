@@ -0,0 +1,80 @@
+"""
+Catalogue aggregates for the reporting dashboards.
+
+The AuthorYearSummary table holds the number of books per (author,
+publication year). Books per year, and books plus first and last
+publication year per author, are grouped from it, so a report reads at most
+one row per author and year and never the book table.
+
+Writes keep it current with deltas: the receivers in api/signals.py move a
+saved or deleted book between (author, year) cells, the bulk views and the
+importer apply one delta per batch. ``manage.py rebuild_book_aggregates``
+recomputes the table from the books to repair any drift.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+
+from .models import AuthorYearSummary, Book
+
+
+def book_keys(books):
+    """Counter of (author id, publication year) over book instances."""
+    return Counter((book.author_id, book.publication_year) for book in books)
+
+
+def apply(deltas):
+    """Add {(author id, year): change in book count} to the summary."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        rows = {
+            (row.author_id, row.publication_year): row
+            for row in AuthorYearSummary.objects.select_for_update()
+            .filter(author_id__in={author for author, _ in deltas})
+        }
+        changed, emptied, created = [], [], []
+        for (author, year), delta in deltas.items():
+            row = rows.get((author, year))
+            if row is None:
+                if delta > 0:
+                    created.append(AuthorYearSummary(author_id=author, publication_year=year, books=delta))
+            elif row.books + delta > 0:
+                row.books += delta
+                changed.append(row)
+            else:
+                emptied.append(row.pk)
+        AuthorYearSummary.objects.bulk_update(changed, ['books'])
+        AuthorYearSummary.objects.filter(pk__in=emptied).delete()
+        AuthorYearSummary.objects.bulk_create(created)
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute the whole summary from the book table. Returns the number of rows."""
+    AuthorYearSummary.objects.all().delete()
+    groups = Book.objects.order_by().values('author', 'publication_year').annotate(n=Count('id'))
+    rows = AuthorYearSummary.objects.bulk_create(
+        (AuthorYearSummary(author_id=g['author'], publication_year=g['publication_year'], books=g['n'])
+         for g in groups.iterator()),
+        batch_size=1000,
+    )
+    return len(rows)
+
+
+def books_per_year():
+    return list(
+        AuthorYearSummary.objects.order_by('publication_year')
+        .values('publication_year').annotate(books=Sum('books'))
+    )
+
+
+def books_per_author():
+    """Books and first/last publication year of every author with books."""
+    return list(
+        AuthorYearSummary.objects.order_by('author')
+        .values('author', name=F('author__name'))
+        .annotate(books=Sum('books'), min_year=Min('publication_year'), max_year=Max('publication_year'))
+    )
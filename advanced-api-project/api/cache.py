@@ -0,0 +1,94 @@
+"""
+Response cache for the book list.
+
+BookListView responses are cached per canonical query: the parameters are
+sorted, empty ones and ones equal to the view's defaults (ordering=title,
+page_size=20) are dropped, so ?ordering=title&author=1 and ?author=1 share an
+entry. Every key contains a table-level version counter that is bumped on
+each Book/Author write (see api/signals.py and the bulk views), which
+invalidates every cached list at once without having to find the keys.
+
+Identical misses are coalesced: the first request takes a short lock in the
+cache and queries the database, the others poll for its result instead of
+running the same query, and only compute it themselves if it takes longer
+than WAIT_TIMEOUT.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'api:books:version'
+
+DEFAULTS = {
+    'TIMEOUT': 60,          # seconds a cached list is served
+    'LOCK_TIMEOUT': 10,     # how long a request may hold the miss lock
+    'WAIT_TIMEOUT': 5,      # how long identical misses wait for it
+    'POLL_INTERVAL': 0.05,
+}
+
+
+def book_cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'BOOK_LIST_CACHE', {})}
+
+
+def _bump():
+    cache.add(VERSION_KEY, 0, timeout=None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def bump_version():
+    """
+    Invalidate every cached book list. Bumps now, so this process stops
+    serving old lists straight away, and again after the commit, so a list
+    another request cached from the pre-commit data is dropped as well.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def canonical_query(request, defaults):
+    params = [
+        (key, value) for key, values in request.query_params.lists() for value in values
+        if value and defaults.get(key) != value
+    ]
+    return urlencode(sorted(params))
+
+
+def list_key(request, defaults):
+    version = cache.get(VERSION_KEY, 0)
+    # next/previous links are absolute, so the host is part of the key
+    raw = f'{request.scheme}://{request.get_host()}{request.path}?{canonical_query(request, defaults)}'
+    return f'api:books:list:{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def get_or_compute(key, compute):
+    """Returns (value, state) with state one of HIT, MISS or WAIT (coalesced miss)."""
+    conf = book_cache_settings()
+    value = cache.get(key)
+    if value is not None:
+        return value, 'HIT'
+
+    lock = f'{key}:lock'
+    locked = cache.add(lock, 1, timeout=conf['LOCK_TIMEOUT'])
+    deadline = time.monotonic() + conf['WAIT_TIMEOUT']
+    while not locked and time.monotonic() < deadline:
+        # an identical request is already querying; wait for its result
+        time.sleep(conf['POLL_INTERVAL'])
+        value = cache.get(key)
+        if value is not None:
+            return value, 'WAIT'
+        locked = cache.add(lock, 1, timeout=conf['LOCK_TIMEOUT'])
+    try:
+        value = compute()
+        cache.set(key, value, timeout=conf['TIMEOUT'])
+        return value, 'MISS'
+    finally:
+        if locked:
+            cache.delete(lock)
@@ -0,0 +1,89 @@
+"""
+Change feed for clients that mirror the catalogue.
+
+Every Book and Author write is recorded in the Change table under a new,
+increasing sequence number: saves and deletes by the receivers in
+api/signals.py, bulk writes and imports by the code doing them. An object
+only keeps its latest entry, so changes_since(seq) returns every object that
+changed after `seq` once, with its current row, or as a tombstone if it was
+deleted.
+
+The new entry is inserted before the object's old one is dropped, and
+compact() never removes the newest entry of the table, so a sequence number
+is never handed out twice. SQLite serializes writes, so entries also become
+visible in sequence order.
+
+compact() removes tombstones older than a retention period. A client whose
+last sequence number is below the latest compaction may have missed deletes
+and has to download the catalogue again.
+"""
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Author, Book, Change, ChangeCompaction
+from .serializers import AuthorSummarySerializer, BookSerializer, values_fields
+
+# kind -> (model, serializer whose fields make up the entry's data)
+KINDS = {
+    'author': (Author, AuthorSummarySerializer),
+    'book': (Book, BookSerializer),
+}
+
+
+def record(kind, ids, deleted=False):
+    """Give the objects `ids` of `kind` ('book' or 'author') a new sequence number."""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return
+    with transaction.atomic():
+        entries = Change.objects.bulk_create([Change(kind=kind, object_id=pk, deleted=deleted) for pk in ids])
+        first = min(entry.seq for entry in entries)
+        Change.objects.filter(kind=kind, object_id__in=ids, seq__lt=first).delete()
+
+
+def latest_seq():
+    return Change.objects.aggregate(seq=Max('seq'))['seq'] or 0
+
+
+def compacted_seq():
+    """Highest sequence number removed by compact(), 0 if it never ran."""
+    return ChangeCompaction.objects.aggregate(seq=Max('seq'))['seq'] or 0
+
+
+def changes_since(since, limit):
+    """
+    Up to `limit` entries with a sequence number above `since`, in order, as
+    {"seq", "type", "id", "deleted", "data"}; data is the object's row in
+    the API's format, None for tombstones.
+    """
+    entries = list(
+        Change.objects.filter(seq__gt=since).order_by('seq')
+        .values_list('seq', 'kind', 'object_id', 'deleted')[:limit]
+    )
+    rows = {}
+    for kind, (model, serializer) in KINDS.items():
+        ids = [pk for _, entry_kind, pk, deleted in entries if entry_kind == kind and not deleted]
+        rows[kind] = {row['id']: row for row in model.objects.filter(pk__in=ids).values(*values_fields(serializer))}
+    return [
+        {
+            'seq': seq,
+            'type': kind,
+            'id': pk,
+            # an object deleted since the entry was read is a tombstone too
+            'deleted': deleted or pk not in rows[kind],
+            'data': None if deleted else rows[kind].get(pk),
+        }
+        for seq, kind, pk, deleted in entries
+    ]
+
+
+def compact(older_than):
+    """Remove the tombstones recorded before `older_than`. Returns the number removed."""
+    with transaction.atomic():
+        tombstones = Change.objects.filter(deleted=True, changed_at__lt=older_than).exclude(seq=latest_seq())
+        top = tombstones.aggregate(seq=Max('seq'))['seq']
+        if top is None:
+            return 0
+        removed, _ = tombstones.filter(seq__lte=top).delete()
+        ChangeCompaction.objects.create(seq=top, tombstones_removed=removed)
+    return removed
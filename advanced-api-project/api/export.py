@@ -0,0 +1,49 @@
+"""
+Streaming export of the book catalogue.
+
+The rows are read with QuerySet.iterator(chunk_size=...), which fetches them
+from the database cursor one chunk at a time, and are encoded one line at a
+time. An export therefore never holds more than a chunk of rows in memory,
+whatever the table size. Used by BookExportView and ``manage.py export_books``.
+"""
+import csv
+
+from .renderers import FastJSONRenderer
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields, chunk_size=2000):
+    """Yield each book as a dict of `fields`, chunk_size rows per fetch."""
+    for values in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        yield dict(zip(fields, values))
+
+
+def ndjson_lines(rows):
+    renderer = FastJSONRenderer()
+    for row in rows:
+        yield renderer.render(row) + b'\n'
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields).encode()
+    for row in rows:
+        yield writer.writerow([row[name] for name in fields]).encode()
+
+
+def export_lines(queryset, fields, export_format, chunk_size=2000):
+    rows = iter_rows(queryset, fields, chunk_size)
+    if export_format == 'csv':
+        return csv_lines(rows, fields)
+    return ndjson_lines(rows)
@@ -0,0 +1,100 @@
+"""
+Parsing and validation of partner book feeds, used by api/importer.py.
+
+A feed is NDJSON (one {"title", "publication_year", "author"} object per
+line) or CSV with a header row naming the same columns; "author" is the
+author's name. Extra keys/columns are ignored.
+
+This module has no Django imports so parse_chunk() can run in worker
+processes that never set Django up. The checks mirror BookSerializer's:
+title and author name non-blank and at most 200 characters, publication
+year an integer not in the future.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+FORMATS = ('ndjson', 'csv')
+FIELDS = ('title', 'publication_year', 'author')
+MAX_LENGTH = 200
+
+
+def open_feed(stream, feed_format):
+    """
+    (header, records) for a binary stream. records lazily yields
+    (line number, raw record): the line for NDJSON, the list of cells for
+    CSV. header is the CSV header row, None for NDJSON.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if feed_format == 'ndjson':
+        records = ((number, line) for number, line in enumerate(text, 1) if line.strip())
+        return None, records
+    reader = csv.reader(text)
+    header = [name.strip() for name in next(reader, [])]
+
+    def records():
+        for cells in reader:
+            if any(cell.strip() for cell in cells):
+                yield reader.line_num, cells
+    return header, records()
+
+
+def chunked(records, size):
+    """Yield lists of at most `size` records."""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _validate(item, current_year):
+    if not isinstance(item, dict):
+        raise ValueError('Expected an object.')
+    missing = [name for name in FIELDS if item.get(name) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}.")
+
+    title, author = item['title'], item['author']
+    for name, value in (('title', title), ('author', author)):
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f'{name}: expected a non-blank string.')
+        if len(value) > MAX_LENGTH:
+            raise ValueError(f'{name}: at most {MAX_LENGTH} characters.')
+
+    year = item['publication_year']
+    if isinstance(year, bool):
+        raise ValueError('publication_year: expected an integer.')
+    try:
+        year = int(year.strip() if isinstance(year, str) else year)
+    except (TypeError, ValueError):
+        raise ValueError('publication_year: expected an integer.')
+    if isinstance(item['publication_year'], float) and item['publication_year'] != year:
+        raise ValueError('publication_year: expected an integer.')
+    if year > current_year:
+        raise ValueError('publication_year: Publication year cannot be in the future.')
+    return title, year, author.strip()
+
+
+def parse_chunk(feed_format, header, current_year, records):
+    """
+    Parse and validate one chunk of (line number, raw record).
+    Returns (rows, rejected): rows are (line, title, year, author name),
+    rejected are (line, error message).
+    """
+    rows, rejected = [], []
+    for line, raw in records:
+        try:
+            if feed_format == 'ndjson':
+                try:
+                    item = json.loads(raw)
+                except ValueError:
+                    raise ValueError('Invalid JSON.')
+            else:
+                item = dict(zip(header, raw))
+            rows.append((line, *_validate(item, current_year)))
+        except ValueError as exc:
+            rejected.append((line, str(exc)))
+    return rows, rejected
@@ -0,0 +1,174 @@
+"""
+Streaming import of partner book feeds (NDJSON or CSV, see api/feeds.py).
+
+The feed is read lazily and cut into chunks of `chunk_size` records. The
+chunks are parsed and validated in a process pool, a few at a time so memory
+stays flat, and committed in feed order: for each chunk one transaction
+upserts its authors by name, bulk-inserts its books, indexes them for search
+and advances the ImportJob checkpoint. If the import crashes, re-running it
+on the same feed with the same job skips the committed chunks without
+parsing them and carries on from there.
+
+Used by ``manage.py import_books`` and BookImportView. The view doesn't
+import anything itself: it stores the upload under settings.BOOK_IMPORT_DIR
+and queues a job, which ``manage.py import_books --queued`` picks up.
+"""
+import datetime
+import functools
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import aggregates, changes, feeds
+from .cache import bump_version
+from .models import Author, Book, ImportJob
+from .search import index_books
+
+MAX_ERRORS = 100  # rejected rows kept on the job
+AUTHOR_BATCH_SIZE = 500
+
+
+def upsert_authors(names):
+    """{name: author id}, creating the authors that don't exist yet."""
+    ids = {}
+    names = sorted(names)
+    for start in range(0, len(names), AUTHOR_BATCH_SIZE):
+        batch = names[start:start + AUTHOR_BATCH_SIZE]
+        # names aren't unique; the oldest author of a name wins
+        for name, pk in Author.objects.filter(name__in=batch).order_by('-id').values_list('name', 'id'):
+            ids[name] = pk
+        missing = [Author(name=name) for name in batch if name not in ids]
+        created = Author.objects.bulk_create(missing)
+        for author in created:
+            ids[author.name] = author.pk
+        changes.record('author', (author.pk for author in created))
+    return ids
+
+
+def commit_chunk(job, index, rows, rejected, started):
+    with transaction.atomic():
+        author_ids = upsert_authors({author for *_, author in rows})
+        books = Book.objects.bulk_create([
+            Book(title=title, publication_year=year, author_id=author_ids[author])
+            for _, title, year, author in rows
+        ])
+        index_books(book.pk for book in books)
+        changes.record('book', (book.pk for book in books))
+        aggregates.apply(aggregates.book_keys(books))
+        bump_version()  # bulk_create sends no post_save
+
+        job.last_chunk = index
+        job.rows_imported += len(books)
+        job.rows_rejected += len(rejected)
+        room = MAX_ERRORS - len(job.errors)
+        job.errors += [{'line': line, 'error': error} for line, error in rejected[:max(room, 0)]]
+        job.elapsed += time.perf_counter() - started
+        job.save(update_fields=['last_chunk', 'rows_imported', 'rows_rejected', 'errors', 'elapsed'])
+
+
+def _parsed(chunks, parse, workers):
+    """Yield (index, parse(records)) in order, at most 2 chunks per worker in flight."""
+    if not workers:
+        for index, records in chunks:
+            yield index, parse(records)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for index, records in chunks:
+            pending.append((index, pool.submit(parse, records)))
+            if len(pending) >= 2 * workers:
+                index, future = pending.popleft()
+                yield index, future.result()
+        while pending:
+            index, future = pending.popleft()
+            yield index, future.result()
+
+
+def run_import(stream, feed_format=None, job=None, source='', chunk_size=1000, workers=None, progress=None):
+    """
+    Import a binary feed stream. Pass the ImportJob of a crashed import as
+    `job` to resume it (its format and chunk size are reused). `workers=0`
+    parses in this process. `progress(job)` is called after every chunk.
+    Returns the job.
+    """
+    if job is None:
+        if feed_format not in feeds.FORMATS:
+            raise ValueError(f'Unknown feed format {feed_format!r}.')
+        job = ImportJob.objects.create(source=source, feed_format=feed_format, chunk_size=chunk_size)
+    elif job.status == 'done':
+        return job
+    else:
+        job.status = 'running'
+        job.save(update_fields=['status'])
+
+    header, records = feeds.open_feed(stream, job.feed_format)
+    chunks = (
+        (index, chunk) for index, chunk in enumerate(feeds.chunked(records, job.chunk_size))
+        if index > job.last_chunk  # already committed by an earlier run
+    )
+    parse = functools.partial(feeds.parse_chunk, job.feed_format, header, datetime.date.today().year)
+
+    try:
+        started = time.perf_counter()
+        for index, (rows, rejected) in _parsed(chunks, parse, workers):
+            commit_chunk(job, index, rows, rejected, started)
+            started = time.perf_counter()
+            if progress is not None:
+                progress(job)
+    except BaseException:
+        job.status = 'failed'
+        job.save(update_fields=['status'])
+        raise
+    job.status = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+    return job
+
+
+def queue_import(upload, feed_format=None, job=None, chunk_size=1000):
+    """
+    Store an uploaded feed and queue it for ``import_books --queued``. Pass
+    a failed job as `job` to queue it again with a new copy of its feed.
+    Returns the job.
+    """
+    if job is None and feed_format not in feeds.FORMATS:
+        raise ValueError(f'Unknown feed format {feed_format!r}.')
+    os.makedirs(settings.BOOK_IMPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix='feed-', dir=settings.BOOK_IMPORT_DIR)
+    with os.fdopen(fd, 'wb') as out:
+        for block in upload.chunks():
+            out.write(block)
+    if job is None:
+        return ImportJob.objects.create(
+            source=upload.name, feed_format=feed_format, chunk_size=chunk_size, status='queued', feed_path=path,
+        )
+    if job.feed_path and os.path.exists(job.feed_path):
+        os.remove(job.feed_path)
+    job.feed_path, job.status = path, 'queued'
+    job.save(update_fields=['feed_path', 'status'])
+    return job
+
+
+def claim_queued_job():
+    """Mark the oldest queued job running and return it, None if the queue is empty."""
+    for pk in ImportJob.objects.filter(status='queued').order_by('pk').values_list('pk', flat=True):
+        # another worker may claim it first
+        if ImportJob.objects.filter(pk=pk, status='queued').update(status='running'):
+            return ImportJob.objects.get(pk=pk)
+    return None
+
+
+def run_queued_import(job, workers=None, progress=None):
+    """Import the stored feed of a queued job; the file is removed once it is done."""
+    with open(job.feed_path, 'rb') as stream:
+        job = run_import(stream, job=job, workers=workers, progress=progress)
+    os.remove(job.feed_path)
+    job.feed_path = ''
+    job.save(update_fields=['feed_path'])
+    return job
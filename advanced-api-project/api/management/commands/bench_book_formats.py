@@ -0,0 +1,70 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.test import APIRequestFactory
+
+from api.models import Author, Book
+from api.parsers import CBORParser, MessagePackParser, cbor2, msgpack
+from api.renderers import CBORRenderer, FastJSONRenderer, MessagePackRenderer
+from api.views import BookListView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare encode time, decode time and payload size of a /api/books/ page '
+        'in JSON, MessagePack and CBOR (the binary formats when msgpack/cbor2 are '
+        'installed). Sample rows are created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Books per page (default 100, at most 100).')
+        parser.add_argument('--repeat', type=int, default=500, help='Encodes/decodes per format (default 500).')
+
+    def formats(self):
+        yield 'json', FastJSONRenderer(), JSONParser()
+        if msgpack is not None:
+            yield 'msgpack', MessagePackRenderer(), MessagePackParser()
+        if cbor2 is not None:
+            yield 'cbor', CBORRenderer(), CBORParser()
+
+    def timed(self, repeat, func):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) * 1e6 / repeat
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        try:
+            with transaction.atomic():
+                author = Author.objects.create(name='Benchmark Author')
+                Book.objects.bulk_create(
+                    Book(title=f'Benchmark book {i} — édition', publication_year=1900 + i % 120, author=author)
+                    for i in range(rows)
+                )
+                # the page the list endpoint really returns, cursor links included
+                request = APIRequestFactory().get(
+                    '/api/books/', {'author': author.pk, 'page_size': rows}, HTTP_HOST='localhost')
+                data = BookListView.as_view()(request).data
+                raise Rollback
+        except Rollback:
+            pass
+
+        expected = None
+        self.stdout.write(f"{'format':<8} {'encode us':>10} {'decode us':>10} {'bytes':>8}")
+        for name, renderer, parser in self.formats():
+            body = renderer.render(data, renderer.media_type)
+            decoded = parser.parse(io.BytesIO(body), parser.media_type)
+            expected = decoded if expected is None else expected  # JSON comes first
+            encode = self.timed(repeat, lambda: renderer.render(data, renderer.media_type))
+            decode = self.timed(repeat, lambda: parser.parse(io.BytesIO(body), parser.media_type))
+            self.stdout.write(f'{name:<8} {encode:>10.1f} {decode:>10.1f} {len(body):>8,}')
+            if decoded != expected:
+                self.stdout.write(self.style.ERROR(f'{name}: decodes to different data than JSON'))
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Author, Book
+from api.renderers import FastJSONRenderer
+from api.serializers import BookSerializer, values_fields
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the throughput of the BookSerializer + JSONRenderer path with '
+        'the .values() + FastJSONRenderer path used by the read-only book views. '
+        'Sample rows are created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Books per page (default 100).')
+        parser.add_argument('--repeat', type=int, default=200, help='Pages rendered per path (default 200).')
+
+    def timed(self, repeat, render):
+        body = render()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            render()
+        return time.perf_counter() - start, body
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        try:
+            with transaction.atomic():
+                author = Author.objects.create(name='Benchmark Author')
+                Book.objects.bulk_create(
+                    Book(title=f'Benchmark book {i} — édition', publication_year=1900 + i % 120, author=author)
+                    for i in range(rows)
+                )
+                queryset = Book.objects.filter(author=author).order_by('title', 'id')
+                fields = values_fields(BookSerializer)
+
+                slow, slow_body = self.timed(repeat, lambda: JSONRenderer().render(
+                    BookSerializer(queryset, many=True).data))
+                fast, fast_body = self.timed(repeat, lambda: FastJSONRenderer().render(
+                    list(queryset.values(*fields))))
+                raise Rollback
+        except Rollback:
+            pass
+
+        total = rows * repeat
+        self.stdout.write(f'serializer: {total / slow:>10,.0f} rows/s ({slow * 1000 / repeat:.2f} ms/page)')
+        self.stdout.write(f'values:     {total / fast:>10,.0f} rows/s ({fast * 1000 / repeat:.2f} ms/page)')
+        self.stdout.write(f'speedup:    {slow / fast:.1f}x')
+        if slow_body != fast_body:
+            self.stdout.write(self.style.ERROR('output differs between the two paths'))
+        else:
+            self.stdout.write(self.style.SUCCESS('output is identical'))
@@ -0,0 +1,20 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove change feed tombstones older than --days. Clients that last '
+        'synced before the removed tombstones must download the catalogue again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Tombstones kept, in days (default 30).')
+
+    def handle(self, *args, **options):
+        removed = changes.compact(timezone.now() - datetime.timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} tombstones.'))
@@ -0,0 +1,50 @@
+import sys
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import reverse
+
+from api import export
+from api.views import BookExportView
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream the book catalogue as NDJSON or CSV, with the same filters as '
+        '/api/books/, e.g. `export_books csv author=1 search=potter -o books.csv`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('export_format', choices=list(export.FORMATS))
+        parser.add_argument('params', nargs='*', metavar='name=value',
+                            help='Query parameters of the book list: filters, search, ordering, fields.')
+        parser.add_argument('-o', '--output', help='File to write to (default: stdout).')
+        parser.add_argument('--chunk-size', type=int, default=BookExportView.chunk_size,
+                            help='Rows fetched from the database at a time.')
+
+    def handle(self, *args, **options):
+        params = []
+        for param in options['params']:
+            name, sep, value = param.partition('=')
+            if not sep:
+                raise CommandError(f'Expected name=value, got {param!r}.')
+            params.append((name, value))
+
+        url = reverse('book-export', args=[options['export_format']])
+        request = RequestFactory().get(f'{url}?{urlencode(params)}')
+        view = BookExportView.as_view(chunk_size=options['chunk_size'])
+        response = view(request, export_format=options['export_format'])
+        if not response.streaming:
+            response.render()
+            raise CommandError(response.content.decode())
+
+        out = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in response.streaming_content:
+                out.write(chunk)
+        finally:
+            if options['output']:
+                out.close()
+            else:
+                out.flush()
@@ -0,0 +1,86 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import feeds, importer
+from api.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Import books from an NDJSON or CSV feed (title, publication_year, author name). '
+        'A crashed import can be resumed with --resume <job id>. '
+        'With --queued, runs the imports uploaded to POST /api/books/import/ instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?')
+        parser.add_argument('--format', dest='feed_format', choices=feeds.FORMATS,
+                            help='Feed format (default: from the file extension).')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Records per transaction (default 1000).')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Parser processes, 0 to parse in this process (default: one per CPU).')
+        parser.add_argument('--resume', type=int, metavar='JOB_ID',
+                            help='Continue a failed import after its last committed chunk.')
+        parser.add_argument('--queued', action='store_true',
+                            help='Run the queued uploads, oldest first, until the queue is empty.')
+        parser.add_argument('--poll', type=float, metavar='SECONDS',
+                            help='With --queued, keep waiting for new uploads, checking every SECONDS.')
+
+    def progress(self, job):
+        self.stdout.write(
+            f'chunk {job.last_chunk}: {job.rows_imported} imported, '
+            f'{job.rows_rejected} rejected, {job.rows_per_second} rows/s'
+        )
+
+    def report(self, job):
+        for error in job.errors[:20]:
+            self.stdout.write(self.style.WARNING(f"line {error['line']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f'Import {job.pk} done: {job.rows_imported} books imported, {job.rows_rejected} rows rejected, '
+            f'{job.rows_per_second} rows/s.'
+        ))
+
+    def run_queued(self, options):
+        while True:
+            job = importer.claim_queued_job()
+            if job is None:
+                if options['poll'] is None:
+                    return
+                time.sleep(options['poll'])
+                continue
+            self.stdout.write(f'Running {job}.')
+            try:
+                job = importer.run_queued_import(job, workers=options['workers'], progress=self.progress)
+            except Exception as exc:
+                # the job is marked failed and can be resumed; go on with the next one
+                self.stderr.write(self.style.ERROR(f'Import {job.pk} failed: {exc}'))
+                continue
+            self.report(job)
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            return self.run_queued(options)
+        if not options['path']:
+            raise CommandError('Give the path of a feed, or --queued.')
+
+        job = None
+        if options['resume']:
+            try:
+                job = ImportJob.objects.get(pk=options['resume'])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"No import job {options['resume']}.")
+            self.stdout.write(f'Resuming {job} after chunk {job.last_chunk}.')
+
+        feed_format = options['feed_format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if job is None and feed_format not in feeds.FORMATS:
+            raise CommandError(f"Can't tell the feed format of {options['path']}, pass --format.")
+
+        with open(options['path'], 'rb') as stream:
+            job = importer.run_import(
+                stream, feed_format, job=job, source=os.path.basename(options['path']),
+                chunk_size=options['chunk_size'], workers=options['workers'], progress=self.progress,
+            )
+        self.report(job)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per (author, publication year) book counts behind /api/books/aggregates/.'
+
+    def handle(self, *args, **options):
+        count = aggregates.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Summarized books into {count} (author, year) rows.'))
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:59
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# a frozen copy of api.search.document_trigrams as of this migration, so
+# later changes to the search code don't change what migrating does; the
+# index can be brought up to date with `manage.py rebuild_book_search_index`
+
+def document_trigrams(title, author_name):
+    def trigrams(text):
+        text = unicodedata.normalize('NFKD', text or '')
+        text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+        grams = set()
+        for word in re.findall(r'\w+', text.casefold()):
+            padded = f'  {word} '
+            grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+        return grams
+
+    weights = dict.fromkeys(trigrams(title), 2)
+    for gram in trigrams(author_name):
+        weights[gram] = weights.get(gram, 0) + 1
+    return weights
+
+
+def index_existing_books(apps, schema_editor):
+    Book = apps.get_model('api', 'Book')
+    BookTrigram = apps.get_model('api', 'BookTrigram')
+    rows = []
+    for pk, title, author_name in Book.objects.values_list('id', 'title', 'author__name').iterator():
+        rows += [BookTrigram(book_id=pk, trigram=gram, weight=weight)
+                 for gram, weight in document_trigrams(title, author_name).items()]
+        if len(rows) >= 10000:
+            BookTrigram.objects.bulk_create(rows, batch_size=1000)
+            rows = []
+    BookTrigram.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='api.book')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('trigram', 'book'), name='api_booktrigram_trigram_book')],
+            },
+        ),
+        migrations.RunPython(index_existing_books, migrations.RunPython.noop),
+    ]
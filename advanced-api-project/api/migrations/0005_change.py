@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+def record_existing_objects(apps, schema_editor):
+    # clients syncing from 0 get the whole catalogue, authors first
+    Change = apps.get_model('api', 'Change')
+    for kind, model in (('author', apps.get_model('api', 'Author')), ('book', apps.get_model('api', 'Book'))):
+        ids = model.objects.order_by('pk').values_list('pk', flat=True).iterator()
+        Change.objects.bulk_create((Change(kind=kind, object_id=pk) for pk in ids), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_book_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField()),
+                ('tombstones_removed', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('book', 'Book'), ('author', 'Author')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='api_change_object_idx')],
+            },
+        ),
+        migrations.RunPython(record_existing_objects, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def summarize_existing_books(apps, schema_editor):
+    Book = apps.get_model('api', 'Book')
+    AuthorYearSummary = apps.get_model('api', 'AuthorYearSummary')
+    groups = Book.objects.order_by().values('author', 'publication_year').annotate(n=Count('id'))
+    AuthorYearSummary.objects.bulk_create(
+        (AuthorYearSummary(author_id=g['author'], publication_year=g['publication_year'], books=g['n'])
+         for g in groups.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorYearSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('publication_year', models.IntegerField()),
+                ('books', models.PositiveIntegerField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='year_summaries', to='api.author')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['publication_year'], name='api_summary_year_idx')],
+                'constraints': [models.UniqueConstraint(fields=('author', 'publication_year'), name='api_authoryearsummary_author_year')],
+            },
+        ),
+        migrations.RunPython(summarize_existing_books, migrations.RunPython.noop),
+    ]
@@ -19,6 +19,132 @@ class Book(models.Model):
     title = models.CharField(max_length=200)
     publication_year = models.IntegerField()
     author = models.ForeignKey(Author, related_name='books', on_delete=models.CASCADE)
+    # validator for conditional GETs (ETag/Last-Modified), not part of the API
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.title} ({self.publication_year})"
+
+
+class BookTrigram(models.Model):
+    """
+    Trigram index used by the book search (see api/search.py).
+    One row per distinct trigram of a book's title and author name, weighted
+    2 for the title, 1 for the author name (3 if it occurs in both).
+    Kept in sync by api/signals.py and the bulk views.
+    """
+    book = models.ForeignKey(Book, related_name='trigrams', on_delete=models.CASCADE)
+    trigram = models.CharField(max_length=3)
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            # also the index the search looks trigrams up with
+            models.UniqueConstraint(fields=['trigram', 'book'], name='api_booktrigram_trigram_book'),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram!r} of book {self.book_id}"
+
+
+class ImportJob(models.Model):
+    """
+    Progress of one feed import (see api/importer.py).
+    Saved in the same transaction as each chunk of books, so last_chunk is
+    always the last chunk really in the database and a crashed import can
+    resume right after it.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    source = models.CharField(max_length=200, blank=True)
+    feed_format = models.CharField(max_length=10)
+    chunk_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    last_chunk = models.IntegerField(default=-1)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)  # first rejected rows: {"line", "error"}
+    elapsed = models.FloatField(default=0)  # seconds spent importing, over all runs
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    feed_path = models.CharField(max_length=500, blank=True)  # uploaded feed waiting for import_books --queued
+
+    @property
+    def rows_per_second(self):
+        rows = self.rows_imported + self.rows_rejected
+        return round(rows / self.elapsed, 1) if self.elapsed else 0.0
+
+    def __str__(self):
+        return f"Import {self.pk} of {self.source or 'upload'} ({self.status})"
+
+
+class Change(models.Model):
+    """
+    Change feed of the catalogue (see api/changes.py).
+    One row per book or author that changed, holding the sequence number of
+    its latest write: every write inserts a new row and drops the object's
+    older one, so the table only grows with tombstones (deleted=True), which
+    ``manage.py compact_changes`` trims.
+    """
+    KIND_CHOICES = [
+        ('book', 'Book'),
+        ('author', 'Author'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'object_id'], name='api_change_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.seq}: {self.kind} {self.object_id}{' deleted' if self.deleted else ''}"
+
+
+class ChangeCompaction(models.Model):
+    """
+    One run of the tombstone compaction. Clients syncing from a sequence
+    number below the highest `seq` here may have missed deletes and must
+    download the catalogue again.
+    """
+    seq = models.BigIntegerField()  # highest sequence number removed
+    tombstones_removed = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Compaction up to {self.seq} ({self.tombstones_removed} tombstones)"
+
+
+class AuthorYearSummary(models.Model):
+    """
+    Number of books per (author, publication year), the summary the
+    aggregates endpoint reads instead of grouping the book table (see
+    api/aggregates.py). Rows whose count drops to zero are removed.
+    Kept in sync by api/signals.py, the bulk views and the importer;
+    ``manage.py rebuild_book_aggregates`` recomputes it from scratch.
+    """
+    author = models.ForeignKey(Author, related_name='year_summaries', on_delete=models.CASCADE)
+    publication_year = models.IntegerField()
+    books = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'publication_year'], name='api_authoryearsummary_author_year'),
+        ]
+        indexes = [
+            # books per year
+            models.Index(fields=['publication_year'], name='api_summary_year_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.books} books by author {self.author_id} in {self.publication_year}"
@@ -0,0 +1,180 @@
+"""
+Pagination for the Book API.
+
+BookCursorPagination
+--------------------
+Keyset (cursor) pagination that follows the OrderingFilter:
+- The page is ordered by the requested ordering field (one of the view's
+  ordering_fields, e.g. title or -publication_year) plus id as tie-breaker,
+  and the next page is fetched with a seek on that (field, id) pair, so
+  there is no COUNT and no OFFSET whatever the table size.
+- Cursors are opaque and remember the ordering they were issued for; a
+  cursor used with a different ordering is rejected.
+- ?page_size= can shrink or grow the page up to max_page_size.
+- Filters and search are applied before pagination, and next/previous links
+  keep the other query parameters, so cursors stay valid for the same query.
+- The author list uses it too, ordered by name.
+"""
+
+import base64
+import json
+import math
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_VALUE = '_cursor_value'
+CURSOR_ID = '_cursor_id'
+
+
+class BookCursorPagination(BasePagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    default_ordering = 'title'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size < 1:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """The single ordering field in use, e.g. 'title' or '-publication_year'."""
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return ordering[0]
+        view_ordering = getattr(view, 'ordering', None) or [self.default_ordering]
+        return view_ordering[0] if isinstance(view_ordering, (list, tuple)) else view_ordering
+
+    def encode_cursor(self, ordering, value, pk, reverse):
+        raw = json.dumps({'o': ordering, 'v': value, 'id': pk, 'r': reverse})
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def get_ordering_field(self, queryset, name):
+        """The model field, or annotation output field, the page is ordered by."""
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return queryset.query.annotations[name].output_field
+
+    def decode_cursor(self, request, ordering, field):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            if cursor['o'] != ordering:
+                raise ValueError
+            # the value goes straight into the seek filter: only a scalar
+            # the ordering field accepts
+            value = cursor['v']
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                raise ValueError
+            if isinstance(value, float) and not math.isfinite(value):
+                raise ValueError
+            value, pk = field.to_python(value), int(cursor['id'])
+            # the database can't compare with integers wider than 64 bits
+            if any(isinstance(n, int) and not -2 ** 63 <= n < 2 ** 63 for n in (value, pk)):
+                raise ValueError
+            return value, pk, bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, OverflowError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        descending = self.ordering.startswith('-')
+        self.field = self.ordering.lstrip('-')
+
+        cursor = self.decode_cursor(request, self.ordering, self.get_ordering_field(queryset, self.field))
+        reverse = False
+        if cursor is not None:
+            value, pk, reverse = cursor
+            # walking forwards on a descending ordering seeks downwards, and
+            # a reversed (previous page) cursor walks the other way
+            downwards = descending != reverse
+            lookup = 'lt' if downwards else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value}) |
+                Q(**{self.field: value, f'id__{lookup}': pk})
+            )
+        walk_descending = descending != reverse
+        prefix = '-' if walk_descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        # .values() rows need the sort key and id for the links even when the
+        # view doesn't output them (search_rank, ?fields=); stripped below
+        fields = getattr(queryset, '_fields', None)
+        extra = fields and not {self.field, 'id'} <= set(fields)
+        if extra:
+            queryset = queryset.annotate(**{CURSOR_VALUE: F(self.field), CURSOR_ID: F('id')})
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        if extra:
+            return [{k: v for k, v in row.items() if k not in (CURSOR_VALUE, CURSOR_ID)} for row in rows]
+        return rows
+
+    def _link(self, row, reverse):
+        url = self.request.build_absolute_uri()
+        if isinstance(row, dict):  # .values() rows from the fast read path
+            if CURSOR_VALUE in row:
+                value, pk = row[CURSOR_VALUE], row[CURSOR_ID]
+            else:
+                value, pk = row[self.field], row['id']
+        else:
+            value, pk = getattr(row, self.field), row.pk
+        token = self.encode_cursor(self.ordering, value, pk, reverse)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
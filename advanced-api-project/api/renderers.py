@@ -0,0 +1,94 @@
+"""
+Renderers for the Book API.
+
+FastJSONRenderer
+----------------
+Drop-in replacement for DRF's JSONRenderer that encodes with orjson when it
+is installed. The output is byte for byte what JSONRenderer produces with the
+default settings (compact separators, UTF-8 instead of \\u escapes, U+2028 and
+U+2029 escaped). Anything orjson would encode differently from DRF's
+JSONEncoder (datetimes, dataclasses, lazy strings, Decimals, ...) makes it fall
+back to JSONRenderer for that response, so it is safe as the default renderer.
+
+MessagePackRenderer, CBORRenderer
+---------------------------------
+Binary encodings for clients that ask for them with
+``Accept: application/msgpack`` / ``application/cbor`` (or ?format=msgpack /
+?format=cbor); JSON stays the default. They carry the same data as the JSON
+body. Values the format has no type for (lazy strings, and for MessagePack
+datetimes, Decimals, UUIDs, ...) are converted by DRF's JSONEncoder; CBOR
+encodes datetimes, Decimals and UUIDs with its own tags. They need the
+optional msgpack and cbor2 packages, and settings only registers them when
+those are installed.
+The matching parsers are in api/parsers.py.
+"""
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency, JSONRenderer is used without it
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency, MessagePackRenderer needs it
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional dependency, CBORRenderer needs it
+    cbor2 = None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def can_encode_fast(self, accepted_media_type, renderer_context):
+        if orjson is None or not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON):
+            return False
+        # ?indent= / Accept: application/json; indent=4 need the stdlib encoder
+        return self.get_indent(accepted_media_type, renderer_context or {}) is None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.can_encode_fast(accepted_media_type, renderer_context):
+            try:
+                body = orjson.dumps(data, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+            except TypeError:
+                pass
+            else:
+                # JSONRenderer escapes these for JavaScript compatibility
+                return body.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+def _json_default(obj):
+    # whatever the JSON renderer would turn the value into
+    return JSONEncoder().default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_json_default, use_bin_type=True)
+
+
+class CBORRenderer(BaseRenderer):
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data, default=lambda encoder, obj: encoder.encode(_json_default(obj)))
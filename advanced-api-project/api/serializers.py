@@ -1,19 +1,116 @@
+from functools import lru_cache
+
+from urllib.parse import urlencode
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Prefetch
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Author, Book
+from rest_framework.settings import api_settings
+from .models import Author, Book, ImportJob
+from .pagination import BookCursorPagination
 import datetime
 
+# field types whose to_representation() is the column value unchanged
+PLAIN_FIELD_TYPES = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class BatchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that first looks the pk up in
+    context['related_objects'][field_name] ({pk: object}, filled by
+    BookSerializer.batch_context) and only queries when there is no batch.
+    """
+
+    def to_internal_value(self, data):
+        batch = self.context.get('related_objects', {}).get(self.field_name)
+        if batch is None or self.pk_field is not None or isinstance(data, bool):
+            return super().to_internal_value(data)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in batch:
+            self.fail('does_not_exist', pk_value=data)
+        return batch[pk]
+
+
+class BookListSerializer(serializers.ListSerializer):
+    """
+    Validates many books with one query per related model: every referenced
+    author is resolved with a single `in` lookup and every item is checked
+    against the same clock reading. Errors are still reported per item.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.context.update(self.child.batch_context(data))
+        return super().to_internal_value(data)
+
+
+class AuthorSummarySerializer(serializers.ModelSerializer):
+    """Author as nested in a book with ?expand=author."""
+
+    class Meta:
+        model = Author
+        fields = ['id', 'name']
+
 
 class BookSerializer(serializers.ModelSerializer):
     """
     Serializer for the Book model.
     Includes validation to ensure publication year is not in the future.
+    With many=True, validation is batched by BookListSerializer.
+
+    `fields` (names to keep) and `expand` (names of expandable_fields to nest
+    instead of showing the pk) shape the output, see BookValuesMixin.
     """
+    serializer_related_field = BatchedPrimaryKeyRelatedField
+    expandable_fields = {'author': AuthorSummarySerializer}
+
     class Meta:
         model = Book
-        fields = '__all__'
+        fields = ['id', 'title', 'publication_year', 'author']
+        list_serializer_class = BookListSerializer
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in expand:
+            if name in self.fields:
+                self.fields[name] = self.expandable_fields[name](read_only=True)
+
+    def batch_context(self, items):
+        """
+        Context entries that let many BookSerializers validate `items`
+        without a query or clock read per item.
+        """
+        related = {}
+        for name, field in self.fields.items():
+            if not isinstance(field, BatchedPrimaryKeyRelatedField) or field.read_only:
+                continue
+            pk_field = field.get_queryset().model._meta.pk
+            pks = set()
+            for item in items:
+                value = item.get(name) if isinstance(item, dict) else None
+                if value is None or isinstance(value, bool):
+                    continue
+                try:
+                    pks.add(pk_field.to_python(value))
+                except DjangoValidationError:
+                    pass
+            related[name] = field.get_queryset().in_bulk(pks) if pks else {}
+        return {'related_objects': related, 'current_year': datetime.date.today().year}
 
     def validate_publication_year(self, value):
-        current_year = datetime.date.today().year
+        current_year = self.context.get('current_year') or datetime.date.today().year
         if value > current_year:
             raise serializers.ValidationError("Publication year cannot be in the future.")
         return value
@@ -22,10 +119,71 @@ class BookSerializer(serializers.ModelSerializer):
 class AuthorSerializer(serializers.ModelSerializer):
     """
     Serializer for the Author model.
-    Includes a nested BookSerializer to show the author’s books.
+    Nests a preview of the author’s books (the first few by title) with the
+    total books_count and a books_next link to the rest of the book list.
+    Querysets must go through setup_eager_loading().
     """
-    books = BookSerializer(many=True, read_only=True)  # nested serializer
+    books = BookSerializer(many=True, read_only=True, source='book_preview')  # nested serializer
+    books_count = serializers.IntegerField(read_only=True)
+    books_next = serializers.SerializerMethodField()
 
     class Meta:
         model = Author
-        fields = ['id', 'name', 'books']
+        fields = ['id', 'name', 'books', 'books_count', 'books_next']
+
+    @staticmethod
+    def setup_eager_loading(queryset, preview_size=5):
+        """
+        Count every author's books and prefetch only the first `preview_size`
+        of them, so a page of authors costs two queries however many
+        authors or books there are.
+        """
+        preview = Book.objects.order_by('title', 'id')[:preview_size]
+        return queryset.annotate(books_count=Count('books')).prefetch_related(
+            Prefetch('books', queryset=preview, to_attr='book_preview')
+        )
+
+    def get_books_next(self, author):
+        """Cursor link to the author's books after the preview, or None if it shows them all."""
+        preview = author.book_preview
+        if author.books_count <= len(preview):
+            return None
+        last = preview[-1]
+        cursor = BookCursorPagination().encode_cursor('title', last.title, last.pk, False)
+        url = f"{reverse('book-list')}?{urlencode({'author': author.pk, 'cursor': cursor})}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Read-only progress report of a feed import."""
+    rows_per_second = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = ['id', 'source', 'feed_format', 'chunk_size', 'status', 'last_chunk', 'rows_imported',
+                  'rows_rejected', 'rows_per_second', 'errors', 'created_at', 'finished_at']
+        read_only_fields = fields
+
+
+@lru_cache(maxsize=None)
+def values_fields(serializer_class):
+    """
+    The readable field names of a ModelSerializer if every one of them maps
+    straight to a model column, else None.
+    When this returns names, `queryset.values(*names)` yields exactly the dicts
+    the serializer would produce, so read-only views can skip the serializer.
+    """
+    names = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if not isinstance(field, PLAIN_FIELD_TYPES) or field.source != name:
+            return None
+        if isinstance(field, serializers.BigIntegerField) and getattr(
+                field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING):
+            return None
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is not None:
+            return None
+        names.append(name)
+    return tuple(names)
@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Author, Book
+from . import aggregates, cache, changes, search
+
+# set while a bulk view deletes a batch and does its bookkeeping once itself
+_bulk_delete = ContextVar('bulk_delete', default=False)
+
+
+@contextmanager
+def bulk_delete():
+    """Silence the per-row post_delete bookkeeping below."""
+    token = _bulk_delete.set(True)
+    try:
+        yield
+    finally:
+        _bulk_delete.reset(token)
+
+
+# any book or author write invalidates the cached book lists
+# (author names are searchable); bulk_create/bulk_update send no signals,
+# so the bulk views call cache.bump_version() themselves
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_book_lists(sender, **kwargs):
+    if not _bulk_delete.get():
+        cache.bump_version()
+
+
+# keep the trigram search index in sync (deletes cascade to it);
+# the bulk views call search.index_books() themselves
+
+@receiver(post_save, sender=Book)
+def index_book_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_books([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def reindex_books_on_author_save(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.index_books(instance.books.values_list('pk', flat=True))
+
+
+# change feed, see api/changes.py; the bulk views and the importer
+# record their bulk_create/bulk_update writes themselves
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+def record_change_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changes.record(sender._meta.model_name, [instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+def record_tombstone_on_delete(sender, instance, **kwargs):
+    if not _bulk_delete.get():
+        changes.record(sender._meta.model_name, [instance.pk], deleted=True)
+
+
+# per (author, year) book counts, see api/aggregates.py; the bulk views
+# and the importer apply their bulk_create/bulk_update deltas themselves
+
+@receiver(pre_save, sender=Book)
+def remember_summary_key(sender, instance, raw=False, **kwargs):
+    instance._summary_key = None
+    if not raw and not instance._state.adding:
+        instance._summary_key = (
+            Book.objects.filter(pk=instance.pk).values_list('author_id', 'publication_year').first()
+        )
+
+
+@receiver(post_save, sender=Book)
+def count_saved_book(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = aggregates.book_keys([instance])
+    old = getattr(instance, '_summary_key', None)
+    if old is not None:
+        deltas[old] -= 1
+    aggregates.apply(deltas)
+
+
+@receiver(post_delete, sender=Book)
+def uncount_deleted_book(sender, instance, **kwargs):
+    if not _bulk_delete.get():
+        aggregates.apply({(instance.author_id, instance.publication_year): -1})
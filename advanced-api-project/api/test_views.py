@@ -1,8 +1,36 @@
+import base64
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, Max, Min, Sum
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
-from .models import Author, Book
+from .models import Author, AuthorYearSummary, Book, Change, ImportJob
+from . import aggregates
+from . import importer
+from .cache import get_or_compute
+from .parsers import cbor2, msgpack
+from .renderers import FastJSONRenderer
+from .serializers import BookSerializer
+from .views import BookDetailView, BookExportView, BookListView
 
 
 class BookAPITestCase(APITestCase):
@@ -73,3 +101,871 @@ class BookAPITestCase(APITestCase):
         response = self.client.delete(self.book_delete_url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Book.objects.filter(id=self.book.id).exists())
+
+
+class BookPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name="Paged Author")
+        self.other = Author.objects.create(name="Other Author")
+        # duplicate years and titles, so the id tie-breaker matters
+        for i in range(25):
+            Book.objects.create(
+                title=f"Book {i % 7}",
+                publication_year=2000 + i % 3,
+                author=self.author if i % 2 else self.other,
+            )
+        self.url = reverse('book-list')
+
+    def collect(self, params):
+        ids, url, pages = [], self.url, 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [book["id"] for book in response.data["results"]]
+            pages += 1
+            if not response.data["next"]:
+                return ids, pages, response
+            response = self.client.get(response.data["next"])
+
+    def test_walks_every_book_once_in_order(self):
+        for ordering, key in [
+            ("title", lambda b: (b.title, b.id)),
+            ("-publication_year", lambda b: (-b.publication_year, -b.id)),
+        ]:
+            ids, pages, _ = self.collect({"ordering": ordering, "page_size": 4})
+            expected = [b.id for b in sorted(Book.objects.all(), key=key)]
+            self.assertEqual(ids, expected)
+            self.assertEqual(pages, 7)
+
+    def test_previous_link_returns_the_previous_page(self):
+        first = self.client.get(self.url, {"page_size": 5})
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+        self.assertIsNone(first.data["previous"])
+
+    def test_page_size_is_capped(self):
+        Book.objects.bulk_create(
+            Book(title=f"Bulk {i}", publication_year=1990, author=self.author) for i in range(120)
+        )
+        response = self.client.get(self.url, {"page_size": 1000})
+        self.assertEqual(len(response.data["results"]), 100)
+
+    def test_cursor_keeps_filters(self):
+        ids, _, _ = self.collect({"author": self.author.id, "page_size": 3})
+        self.assertEqual(
+            sorted(ids), sorted(Book.objects.filter(author=self.author).values_list("id", flat=True))
+        )
+
+    def test_cursor_from_another_ordering_is_rejected(self):
+        first = self.client.get(self.url, {"page_size": 5})
+        cursor = first.data["next"].split("cursor=")[1].split("&")[0]
+        response = self.client.get(self.url, {"ordering": "publication_year", "cursor": cursor})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_value_must_fit_the_ordering_field(self):
+        def forged(value, pk=1):
+            raw = json.dumps({"o": "publication_year", "v": value, "id": pk, "r": False})
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        for value in [["x"], {"$gt": 1}, None, True, "not a year", float("inf"), float("nan")]:
+            response = self.client.get(self.url, {"ordering": "publication_year", "cursor": forged(value)})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, value)
+        response = self.client.get(self.url, {"ordering": "publication_year", "cursor": forged(2 ** 70)})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(self.url, {"ordering": "publication_year", "cursor": forged(2001, 2 ** 70)})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # 1e400 is parsed as float infinity
+        token = base64.urlsafe_b64encode(b'{"o": "publication_year", "v": 2001, "id": 1e400, "r": false}').decode()
+        response = self.client.get(self.url, {"ordering": "publication_year", "cursor": token})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(self.url, {"ordering": "publication_year", "cursor": forged("2001")})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class BookFastPathTestCase(APITestCase):
+    """The .values() + FastJSONRenderer path must return the serializer path's exact bytes."""
+
+    def setUp(self):
+        self.author = Author.objects.create(name="Ünïcode Author")
+        titles = ['Plain', 'Quote " and \\ backslash', 'Émoji 😀 and ß', 'Line\u2028sep\u2029para',
+                  'Ctrl \x01\t\n', '</script><b>&amp;']
+        self.books = [
+            Book.objects.create(title=title, publication_year=1990 + i, author=self.author)
+            for i, title in enumerate(titles)
+        ]
+
+    def serializer_path(self, view):
+        return mock.patch.multiple(view, values_fast_path=False, renderer_classes=[JSONRenderer])
+
+    def assertSameBytes(self, url, params=None, view=BookListView):
+        cache.clear()  # both requests must reach the view, not the list cache
+        fast = self.client.get(url, params)
+        cache.clear()
+        with self.serializer_path(view):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, slow.status_code)
+        self.assertEqual(fast["Content-Type"], slow["Content-Type"])
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_list_matches_serializer_path(self):
+        url = reverse('book-list')
+        first = self.assertSameBytes(url, {"page_size": 4})
+        self.assertSameBytes(first.data["next"])
+        self.assertSameBytes(url, {"ordering": "-publication_year", "search": "Émoji"})
+        self.assertSameBytes(url, {"fields": "title,id", "expand": "author", "page_size": 2})
+
+    def test_detail_matches_serializer_path(self):
+        for book in self.books:
+            self.assertSameBytes(reverse('book-detail', args=[book.id]), view=BookDetailView)
+        self.assertSameBytes(reverse('book-detail', args=[book.id]), {"expand": "author"}, view=BookDetailView)
+        self.assertSameBytes(reverse('book-detail', args=[0]), view=BookDetailView)
+
+    def test_list_uses_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('book-list'))
+
+    def test_renderer_falls_back_for_types_orjson_encodes_differently(self):
+        data = {"when": datetime.datetime(2020, 1, 2, 3, 4, 5, 600000), "price": Decimal("1.50"), "tags": {1}}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class BookBulkTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="bulkuser", password="password123")
+        self.author = Author.objects.create(name="Bulk Author")
+        self.books = [
+            Book.objects.create(title=f"Existing {i}", publication_year=2000 + i, author=self.author)
+            for i in range(3)
+        ]
+        self.client.login(username="bulkuser", password="password123")
+
+    def test_bulk_endpoints_require_login(self):
+        self.client.logout()
+        for name in ('book-bulk-create', 'book-bulk-update', 'book-bulk-delete'):
+            response = self.client.post(reverse(name), [], format='json')
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_create(self):
+        items = [{"title": f"New {i}", "publication_year": 2010, "author": self.author.id} for i in range(50)]
+        response = self.client.post(reverse('book-bulk-create'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([book["title"] for book in response.data], [item["title"] for item in items])
+        self.assertTrue(all(book["id"] for book in response.data))
+        self.assertEqual(Book.objects.count(), 53)
+
+    def test_bulk_create_is_all_or_nothing(self):
+        items = [
+            {"title": "Fine", "publication_year": 2010, "author": self.author.id},
+            {"title": "Future", "publication_year": 9999, "author": self.author.id},
+        ]
+        response = self.client.post(reverse('book-bulk-create'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data), [1])
+        self.assertIn("publication_year", response.data[1])
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_bulk_update(self):
+        first, second, _ = self.books
+        items = [{"id": second.id, "title": "Renamed"}, {"id": first.id, "publication_year": 1999}]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(reverse('book-bulk-update'), items, format='json')
+        self.assertEqual([q["sql"].split()[0] for q in ctx.captured_queries].count("UPDATE"), 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([book["id"] for book in response.data], [second.id, first.id])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((second.title, first.publication_year), ("Renamed", 1999))
+
+    def test_bulk_update_reports_missing_and_duplicate_ids(self):
+        book = self.books[0]
+        items = [{"id": book.id, "title": "A"}, {"id": book.id, "title": "B"}, {"id": 0, "title": "C"}]
+        response = self.client.patch(reverse('book-bulk-update'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(sorted(response.data), [1, 2])
+        self.assertIn("id", response.data[1])
+        book.refresh_from_db()
+        self.assertEqual(book.title, "Existing 0")
+
+    def test_bulk_delete(self):
+        ids = [self.books[0].id, 0, self.books[2].id]
+        response = self.client.delete(reverse('book-bulk-delete'), ids, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["status"] for item in response.data], ["deleted", "not_found", "deleted"])
+        self.assertEqual(list(Book.objects.values_list("id", flat=True)), [self.books[1].id])
+
+    def test_bulk_writes_reject_ids_too_big_for_the_database(self):
+        response = self.client.patch(reverse('book-bulk-update'), [{"id": 2 ** 70, "title": "A"}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", response.data[0])
+        response = self.client.delete(reverse('book-bulk-delete'), [self.books[0].id, 2 ** 63], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data), [1])
+        self.assertEqual(Book.objects.count(), len(self.books))
+
+    def test_bulk_delete_does_its_bookkeeping_once(self):
+        Book.objects.bulk_create(
+            Book(title=f"Bulk {i}", publication_year=1990 + i % 3, author=self.author) for i in range(205)
+        )
+        aggregates.rebuild()
+        self.client.force_authenticate(user=self.user)
+        ids = list(Book.objects.filter(title__startswith="Bulk").values_list("id", flat=True))
+        # savepoints, one read, the cascade and the deletes (100 rows per
+        # DELETE), then one insert/delete for the tombstones and the summary
+        with self.assertNumQueries(16):
+            response = self.client.delete(reverse('book-bulk-delete'), ids, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertFalse(AuthorYearSummary.objects.filter(publication_year__lt=2000).exists())
+        self.assertEqual(AuthorYearSummary.objects.aggregate(n=Sum("books"))["n"], 3)
+        self.assertEqual(Change.objects.filter(kind="book", deleted=True).count(), 205)
+
+    @override_settings(BOOK_BULK_MAX_ITEMS=2)
+    def test_batch_cap(self):
+        response = self.client.delete(reverse('book-bulk-delete'), [b.id for b in self.books], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 3)
+
+
+class BookBatchValidationTestCase(APITestCase):
+    def setUp(self):
+        self.authors = [Author.objects.create(name=f"Author {i}") for i in range(5)]
+
+    def items(self, n):
+        return [
+            {"title": f"Book {i}", "publication_year": 2000, "author": self.authors[i % 5].id}
+            for i in range(n)
+        ]
+
+    def test_many_books_cost_one_author_query(self):
+        serializer = BookSerializer(data=self.items(500), many=True)
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data[7]["author"], self.authors[2])
+
+    def test_clock_is_read_once(self):
+        today = datetime.date(2020, 6, 1)
+        with mock.patch("api.serializers.datetime") as clock:
+            clock.date.today.return_value = today
+            serializer = BookSerializer(data=self.items(50) + [
+                {"title": "Late", "publication_year": 2021, "author": self.authors[0].id},
+            ], many=True)
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(clock.date.today.call_count, 1)
+        self.assertIn("publication_year", serializer.errors[50])
+
+    def test_errors_are_reported_per_item(self):
+        items = self.items(4)
+        items[1]["author"] = 0
+        items[2]["author"] = "not-a-pk"
+        items[3]["author"] = str(self.authors[3].id)  # strings are coerced like before
+        serializer = BookSerializer(data=items, many=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(sorted(serializer.errors), [1, 2])
+        self.assertEqual(serializer.errors[1]["author"][0].code, "does_not_exist")
+        self.assertEqual(serializer.errors[2]["author"][0].code, "incorrect_type")
+
+    def test_single_book_still_validates(self):
+        serializer = BookSerializer(data=self.items(1)[0])
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data["author"], self.authors[0])
+
+
+class AuthorAPITestCase(APITestCase):
+    def add_authors(self, n, books_each):
+        for i in range(n):
+            author = Author.objects.create(name=f"Author {Author.objects.count():03}")
+            Book.objects.bulk_create(
+                Book(title=f"Title {j:02}", publication_year=2000, author=author) for j in range(books_each)
+            )
+
+    def test_list_query_count_does_not_grow_with_authors(self):
+        url = reverse('author-list')
+        self.add_authors(2, 3)
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        self.add_authors(15, 8)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 17)
+
+    def test_books_are_a_bounded_preview_with_a_link_to_the_rest(self):
+        self.add_authors(1, 12)
+        author = Author.objects.get()
+        response = self.client.get(reverse('author-detail', args=[author.id]))
+        self.assertEqual(response.data["books_count"], 12)
+        self.assertEqual([b["title"] for b in response.data["books"]], [f"Title {j:02}" for j in range(5)])
+
+        rest = self.client.get(response.data["books_next"])
+        self.assertEqual([b["title"] for b in rest.data["results"]], [f"Title {j:02}" for j in range(5, 12)])
+
+    def test_books_next_is_null_when_the_preview_is_complete(self):
+        self.add_authors(1, 5)
+        response = self.client.get(reverse('author-list'))
+        self.assertEqual(len(response.data["results"][0]["books"]), 5)
+        self.assertIsNone(response.data["results"][0]["books_next"])
+
+
+class BookListCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(name="Cached Author")
+        Book.objects.create(title="First", publication_year=2001, author=self.author)
+        self.url = reverse('book-list')
+
+    def test_equivalent_queries_share_an_entry(self):
+        first = self.client.get(self.url, {"author": self.author.id})
+        self.assertEqual(first["X-Book-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, {"page_size": 20, "ordering": "title", "author": self.author.id})
+        self.assertEqual(again["X-Book-Cache"], "HIT")
+        self.assertEqual(again.data, first.data)
+        self.assertEqual(self.client.get(self.url, {"ordering": "-title"})["X-Book-Cache"], "MISS")
+
+    def test_book_writes_invalidate_the_cache(self):
+        self.client.get(self.url)
+        Book.objects.create(title="Second", publication_year=2002, author=self.author)
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Book-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_bulk_writes_invalidate_the_cache(self):
+        User.objects.create_user(username="cacheuser", password="password123")
+        self.client.login(username="cacheuser", password="password123")
+        self.client.get(self.url)
+        items = [{"title": "Bulk", "publication_year": 2003, "author": self.author.id}]
+        self.client.post(reverse('book-bulk-create'), items, format='json')
+        self.assertEqual(len(self.client.get(self.url).data["results"]), 2)
+
+    def test_identical_misses_are_coalesced(self):
+        calls, states = [], []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.3)
+            return {"results": []}
+
+        def request():
+            states.append(get_or_compute("api:test:coalesce", compute)[1])
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(states), ["MISS", "WAIT", "WAIT", "WAIT"])
+
+
+class BookSearchTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        rowling = Author.objects.create(name="J. K. Rowling")
+        tolkien = Author.objects.create(name="J. R. R. Tolkien")
+        self.stone = Book.objects.create(title="Harry Potter and the Philosopher's Stone",
+                                         publication_year=1997, author=rowling)
+        self.chamber = Book.objects.create(title="Harry Potter and the Chamber of Secrets",
+                                           publication_year=1998, author=rowling)
+        self.hobbit = Book.objects.create(title="The Hobbit", publication_year=1937, author=tolkien)
+        self.url = reverse('book-list')
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {"search": query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book["id"] for book in response.data["results"]]
+
+    def test_typos_still_match(self):
+        self.assertEqual(sorted(self.search("hary poter")), sorted([self.stone.id, self.chamber.id]))
+        self.assertEqual(self.search("hobit"), [self.hobbit.id])
+
+    def test_author_names_and_prefixes_match(self):
+        self.assertEqual(self.search("tolkein"), [self.hobbit.id])
+        self.assertEqual(sorted(self.search("rowl")), sorted([self.stone.id, self.chamber.id]))
+        self.assertEqual(self.search("chamb"), [self.chamber.id])
+
+    def test_results_are_ranked_unless_ordering_is_given(self):
+        self.assertEqual(self.search("potter chamber"), [self.chamber.id, self.stone.id])
+        self.assertEqual(self.search("potter chamber", ordering="-title"), [self.stone.id, self.chamber.id])
+
+    def test_ranked_results_paginate(self):
+        for i in range(6):
+            Book.objects.create(title=f"Potter volume {i}", publication_year=2000, author=self.hobbit.author)
+        first = self.client.get(self.url, {"search": "potter", "page_size": 3})
+        ids = [book["id"] for book in first.data["results"]]
+        self.assertNotIn("search_rank", first.data["results"][0])
+        page = first
+        while page.data["next"]:
+            page = self.client.get(page.data["next"])
+            ids += [book["id"] for book in page.data["results"]]
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+
+    def test_index_follows_writes(self):
+        self.hobbit.title = "The Silmarillion"
+        self.hobbit.save()
+        self.assertEqual(self.search("hobbit"), [])
+        self.assertEqual(self.search("silmarilion"), [self.hobbit.id])
+        self.hobbit.author.name = "Christopher Tolkien"
+        self.hobbit.author.save()
+        self.assertEqual(self.search("christopher"), [self.hobbit.id])
+
+    def test_search_does_not_scan_books(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.search("potter")
+        sql = ctx.captured_queries[0]["sql"]
+        plan = " ".join(row[-1] for row in connection.cursor().execute(f"EXPLAIN QUERY PLAN {sql}").fetchall())
+        self.assertNotIn("SCAN api_book ", plan + " ")
+
+
+class BookFieldSelectionTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.authors = [Author.objects.create(name=f"Author {i}") for i in range(4)]
+        for i in range(12):
+            Book.objects.create(title=f"Book {i:02}", publication_year=2000 + i, author=self.authors[i % 4])
+        self.url = reverse('book-list')
+
+    def test_fields_limits_output_and_selected_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {"fields": "title,id"})
+        self.assertEqual(list(response.data["results"][0]), ["id", "title"])
+        self.assertNotIn("publication_year", ctx.captured_queries[0]["sql"].split("FROM")[0])
+
+    def test_pages_walk_without_id_or_sort_key_in_fields(self):
+        ids, response = [], self.client.get(self.url, {"fields": "author", "ordering": "-publication_year",
+                                                       "page_size": 5})
+        pages = 1
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(list(response.data["results"][0]), ["author"])
+
+    def test_expand_author_is_one_batched_query(self):
+        with self.assertNumQueries(2):  # books + authors of the page
+            response = self.client.get(self.url, {"expand": "author"})
+        first = response.data["results"][0]
+        self.assertEqual(first["author"], {"id": self.authors[0].id, "name": "Author 0"})
+
+    def test_detail_accepts_fields_and_expand(self):
+        book = Book.objects.first()
+        response = self.client.get(reverse('book-detail', args=[book.id]), {"fields": "title,author", "expand": "author"})
+        self.assertEqual(response.data, {"title": book.title, "author": {"id": book.author_id, "name": book.author.name}})
+
+    def test_unknown_names_are_rejected(self):
+        response = self.client.get(self.url, {"fields": "title,isbn"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
+        response = self.client.get(self.url, {"expand": "publisher"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expand", response.data)
+
+
+class BookExportTestCase(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name="Export Author")
+        self.other = Author.objects.create(name="Other Author")
+        self.books = [
+            Book.objects.create(title=f'Book "{i}", vol. é', publication_year=1990 + i,
+                                author=self.author if i % 2 else self.other)
+            for i in range(7)
+        ]
+
+    def export(self, export_format, params=None):
+        response = self.client.get(reverse('book-export', args=[export_format]), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_streams_every_book_in_id_order(self):
+        lines = self.export("ndjson").splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [{"id": b.id, "title": b.title, "publication_year": b.publication_year,
+                           "author": b.author_id} for b in self.books])
+
+    def test_csv_honours_filters_ordering_and_fields(self):
+        body = self.export("csv", {"author": self.author.id, "ordering": "-publication_year",
+                                   "fields": "title,id"})
+        rows = list(csv.reader(io.StringIO(body)))
+        expected = [b for b in reversed(self.books) if b.author_id == self.author.id]
+        self.assertEqual(rows[0], ["id", "title"])
+        self.assertEqual(rows[1:], [[str(b.id), b.title] for b in expected])
+
+    def test_rows_are_fetched_in_chunks(self):
+        with mock.patch.object(BookExportView, "chunk_size", 3), \
+                CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(self.export("ndjson").splitlines()), 7)
+        self.assertEqual(len(ctx.captured_queries), 1)  # one server-side cursor
+
+    def test_unknown_format_is_404(self):
+        response = self.client.get(reverse('book-export', args=["xml"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_management_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "books.ndjson")
+            call_command("export_books", "ndjson", f"author={self.other.id}", "fields=id", "-o", path)
+            with open(path) as f:
+                ids = [json.loads(line)["id"] for line in f]
+        self.assertEqual(ids, [b.id for b in self.books if b.author_id == self.other.id])
+
+
+class BookImportTestCase(APITestCase):
+    def setUp(self):
+        self.existing = Author.objects.create(name="Existing Author")
+
+    def ndjson(self, n, bad=()):
+        lines = []
+        for i in range(n):
+            item = {"title": f"Imported {i}", "publication_year": 1950 + i % 50,
+                    "author": "Existing Author" if i % 3 == 0 else f"New Author {i % 4}"}
+            if i in bad:
+                item["publication_year"] = 9999
+            lines.append(json.dumps(item))
+        lines.insert(1, "{not json")
+        return ("\n".join(lines) + "\n").encode()
+
+    def test_ndjson_import_upserts_authors_and_reports_rejects(self):
+        job = importer.run_import(io.BytesIO(self.ndjson(25, bad={4})), "ndjson", chunk_size=10, workers=0)
+        self.assertEqual((job.status, job.rows_imported, job.rows_rejected), ("done", 24, 2))
+        self.assertEqual(job.last_chunk, 2)
+        self.assertEqual([e["line"] for e in job.errors], [2, 6])
+        self.assertEqual(Author.objects.filter(name="Existing Author").count(), 1)
+        self.assertEqual(Author.objects.count(), 5)
+        self.assertEqual(self.existing.books.count(), 9)
+        self.assertGreater(job.rows_per_second, 0)
+        # imported books are searchable straight away
+        found = self.client.get(reverse('book-list'), {"search": "imported 17"}).data["results"]
+        self.assertEqual(found[0]["title"], "Imported 17")
+
+    def test_csv_import_in_a_process_pool(self):
+        rows = "title,publication_year,author\n" + "".join(
+            f'"Title, {i}",{1990 + i},"Author {i % 2}"\n' for i in range(30)) + ",2000,Nobody\n"
+        job = importer.run_import(io.BytesIO(rows.encode()), "csv", chunk_size=7, workers=2)
+        self.assertEqual((job.rows_imported, job.rows_rejected), (30, 1))
+        self.assertEqual(job.errors[0]["line"], 32)
+        self.assertEqual(sorted(Book.objects.values_list("title", flat=True))[:2], ["Title, 0", "Title, 1"])
+
+    def test_crashed_import_resumes_after_last_committed_chunk(self):
+        feed = self.ndjson(30)
+        real_commit = importer.commit_chunk
+
+        def crash_on_third_chunk(job, index, *args, **kwargs):
+            if index == 2:
+                raise RuntimeError("worker died")
+            return real_commit(job, index, *args, **kwargs)
+
+        with mock.patch.object(importer, "commit_chunk", crash_on_third_chunk):
+            with self.assertRaises(RuntimeError):
+                importer.run_import(io.BytesIO(feed), "ndjson", chunk_size=10, workers=0)
+        job = ImportJob.objects.get()
+        self.assertEqual((job.status, job.last_chunk), ("failed", 1))
+        self.assertEqual(Book.objects.count(), job.rows_imported)
+
+        importer.run_import(io.BytesIO(feed), job=job, workers=0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_imported, job.rows_rejected), ("done", 30, 1))
+        self.assertEqual(Book.objects.count(), 30)
+        self.assertEqual(Book.objects.values("title").distinct().count(), 30)
+
+    def login(self):
+        User.objects.create_user(username="importer", password="password123")
+        self.client.login(username="importer", password="password123")
+
+    def test_upload_is_queued_and_run_by_the_worker(self):
+        url = reverse('book-import')
+        upload = SimpleUploadedFile("feed.ndjson", self.ndjson(5))
+        self.assertEqual(self.client.post(url, {"file": upload}).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.login()
+        upload.seek(0)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(BOOK_IMPORT_DIR=tmp):
+            response = self.client.post(url, {"file": upload})
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual((response.data["status"], response.data["rows_imported"]), ("queued", 0))
+            report_url = reverse('import-job-detail', args=[response.data["id"]])
+            self.assertTrue(response["Location"].endswith(report_url))
+            self.assertEqual(Book.objects.count(), 0)
+            self.assertEqual(len(os.listdir(tmp)), 1)
+
+            out = io.StringIO()
+            call_command("import_books", "--queued", "--workers", "0", stdout=out)
+            self.assertIn(f"Import {response.data['id']} done: 5 books imported", out.getvalue())
+            self.assertEqual(os.listdir(tmp), [])
+        report = self.client.get(report_url)
+        self.assertEqual((report.data["status"], report.data["rows_imported"]), ("done", 5))
+        # the queue is empty now
+        call_command("import_books", "--queued", stdout=io.StringIO())
+        self.assertEqual(Book.objects.count(), 5)
+
+    def test_failed_upload_can_be_queued_again(self):
+        self.login()
+        url = reverse('book-import')
+        with tempfile.TemporaryDirectory() as tmp, override_settings(BOOK_IMPORT_DIR=tmp):
+            feed = SimpleUploadedFile("feed.ndjson", self.ndjson(5))
+            job_id = self.client.post(url, {"file": feed}).data["id"]
+            again = self.client.post(url, {"file": SimpleUploadedFile("feed.ndjson", b""), "job": job_id})
+            self.assertEqual(again.status_code, status.HTTP_400_BAD_REQUEST)  # still queued
+
+            with mock.patch.object(importer, "commit_chunk", side_effect=RuntimeError("disk full")):
+                err = io.StringIO()
+                call_command("import_books", "--queued", "--workers", "0", stdout=io.StringIO(), stderr=err)
+            self.assertIn(f"Import {job_id} failed: disk full", err.getvalue())
+            self.assertEqual(ImportJob.objects.get(pk=job_id).status, "failed")
+
+            feed = SimpleUploadedFile("feed.ndjson", self.ndjson(5))
+            again = self.client.post(url, {"file": feed, "job": job_id})
+            self.assertEqual((again.status_code, again.data["status"]), (status.HTTP_202_ACCEPTED, "queued"))
+            self.assertEqual(len(os.listdir(tmp)), 1)
+            call_command("import_books", "--queued", "--workers", "0", stdout=io.StringIO())
+        self.assertEqual(ImportJob.objects.get(pk=job_id).status, "done")
+        self.assertEqual(Book.objects.count(), 5)
+
+    @override_settings(BOOK_IMPORT_SYNC=True, BOOK_IMPORT_WORKERS=0)
+    def test_synchronous_upload_for_tests(self):
+        self.login()
+        with tempfile.TemporaryDirectory() as tmp, override_settings(BOOK_IMPORT_DIR=tmp):
+            feed = SimpleUploadedFile("feed.ndjson", self.ndjson(5))
+            response = self.client.post(reverse('book-import'), {"file": feed})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((response.data["status"], response.data["rows_imported"]), ("done", 5))
+
+    def test_management_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "feed.ndjson")
+            with open(path, "wb") as f:
+                f.write(self.ndjson(12))
+            out = io.StringIO()
+            call_command("import_books", path, "--workers", "0", "--chunk-size", "5", stdout=out)
+        self.assertIn("12 books imported, 1 rows rejected", out.getvalue())
+
+
+class BookConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.author = Author.objects.create(name="Author")
+        self.book = Book.objects.create(title="Book", publication_year=2001, author=self.author)
+        self.url = reverse('book-detail', args=[self.book.id])
+
+    def test_unchanged_book_is_a_304_from_one_query(self):
+        response = self.client.get(self.url)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('"updated_at"', ctx.captured_queries[0]["sql"].split("FROM")[0])
+        self.assertNotIn('"title"', ctx.captured_queries[0]["sql"])
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.force_authenticate(user=self.user)
+        self.client.patch(reverse('book-bulk-update'), [{"id": self.book.id, "title": "Renamed"}], format="json")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["title"], "Renamed")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_each_representation_has_its_own_etag(self):
+        full = self.client.get(self.url)["ETag"]
+        partial = self.client.get(self.url, {"fields": "title"})["ETag"]
+        self.assertNotEqual(full, partial)
+        response = self.client.get(self.url, {"fields": "title"}, HTTP_IF_NONE_MATCH=full)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", self.client.get(self.url, {"expand": "author"}))
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)["Last-Modified"]
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(reverse('book-detail', args=[0])).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookChangesTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.author = Author.objects.create(name="Author")
+        self.books = [Book.objects.create(title=f"Book {i}", publication_year=2000 + i, author=self.author)
+                      for i in range(5)]
+        self.url = reverse('book-changes')
+
+    def changes(self, since):
+        response = self.client.get(self.url, {"since": since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_initial_sync_returns_every_object_once(self):
+        self.books[0].title = "Renamed"
+        self.books[0].save()
+        data = self.changes(0)
+        entries = [(entry["type"], entry["id"]) for entry in data["results"]]
+        self.assertEqual(sorted(entries), sorted([("author", self.author.id)] + [("book", b.id) for b in self.books]))
+        self.assertEqual(data["results"][-1]["data"]["title"], "Renamed")
+        self.assertEqual(data["seq"], data["results"][-1]["seq"])
+
+    def test_only_changes_after_since_with_tombstones(self):
+        since = self.changes(0)["seq"]
+        self.assertEqual(self.changes(since), {"seq": since, "next": None, "results": []})
+        self.client.force_authenticate(user=self.user)
+        self.client.patch(reverse('book-bulk-update'), [{"id": self.books[1].id, "title": "Bulk"}], format="json")
+        self.client.delete(reverse('book-bulk-delete'), [self.books[2].id], format="json")
+        created = self.client.post(reverse('book-bulk-create'),
+                                   [{"title": "New", "publication_year": 2020, "author": self.author.id}],
+                                   format="json").data[0]
+        results = self.changes(since)["results"]
+        self.assertEqual(
+            [(entry["id"], entry["deleted"]) for entry in results],
+            [(self.books[1].id, False), (self.books[2].id, True), (created["id"], False)],
+        )
+        self.assertEqual(results[0]["data"]["title"], "Bulk")
+        self.assertIsNone(results[1]["data"])
+
+    def test_pages_follow_next(self):
+        ids, url = [], f"{self.url}?since=0&page_size=2"
+        while url:
+            data = self.client.get(url).data
+            ids += [entry["id"] for entry in data["results"]]
+            url = data["next"]
+        self.assertEqual(len(ids), 6)
+
+    def test_compaction_trims_old_tombstones(self):
+        since = self.changes(0)["seq"]
+        for book in self.books[:3]:
+            book.delete()
+        Book.objects.create(title="Later", publication_year=2001, author=self.author)
+        out = io.StringIO()
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() + datetime.timedelta(days=31)):
+            call_command("compact_changes", stdout=out)
+        self.assertIn("Removed 3 tombstones", out.getvalue())
+        response = self.client.get(self.url, {"since": since})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        results = self.changes(0)["results"]
+        self.assertEqual(len(results), 4)
+        self.assertFalse(any(entry["deleted"] for entry in results))
+
+    def test_invalid_since_is_rejected(self):
+        response = self.client.get(self.url, {"since": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookBatchLookupTestCase(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name="Author")
+        self.books = [Book.objects.create(title=f"Book {i}", publication_year=2000 + i, author=self.author)
+                      for i in range(4)]
+        self.url = reverse('book-batch')
+
+    def test_get_keeps_order_and_reports_missing_in_one_query(self):
+        ids = [self.books[2].id, 0, self.books[0].id, self.books[2].id]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"ids": ",".join(map(str, ids))})
+        self.assertEqual([book["id"] for book in response.data["results"]], [self.books[2].id, self.books[0].id])
+        self.assertEqual(response.data["missing"], [0])
+        self.assertEqual(response.data["results"][0], BookSerializer(self.books[2]).data)
+
+    def test_post_body_with_fields_and_expand(self):
+        ids = [self.books[3].id, self.books[1].id]
+        response = self.client.post(f"{self.url}?fields=title,author&expand=author", {"ids": ids}, format="json")
+        self.assertEqual(response.data["results"], [
+            {"title": "Book 3", "author": {"id": self.author.id, "name": "Author"}},
+            {"title": "Book 1", "author": {"id": self.author.id, "name": "Author"}},
+        ])
+        response = self.client.post(self.url, ids, format="json")
+        self.assertEqual([book["title"] for book in response.data["results"]], ["Book 3", "Book 1"])
+
+    @override_settings(BOOK_BATCH_MAX_IDS=3)
+    def test_invalid_and_oversized_batches_are_rejected(self):
+        for params in ({"ids": "1,x"}, {"ids": ""}, {"ids": "1,2,3,4"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("ids", response.data)
+        response = self.client.post(self.url, {"ids": ["1"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ids_too_big_for_the_database_are_rejected(self):
+        response = self.client.get(self.url, {"ids": "1,99999999999999999999999"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {"ids": [1, 2 ** 63]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookAggregatesTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.authors = [Author.objects.create(name=f"Author {i}") for i in range(3)]
+        for i in range(9):
+            Book.objects.create(title=f"Book {i}", publication_year=2000 + i % 3, author=self.authors[i % 2])
+        self.url = reverse('book-aggregates')
+
+    def expected(self):
+        per_year = (Book.objects.order_by("publication_year").values("publication_year")
+                    .annotate(books=Count("id")))
+        per_author = (Book.objects.order_by("author").values("author", name=F("author__name"))
+                      .annotate(books=Count("id"), min_year=Min("publication_year"),
+                                max_year=Max("publication_year")))
+        return {"books_per_year": list(per_year), "authors": list(per_author)}
+
+    def test_report_is_read_from_the_summary_table(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.data, self.expected())
+        self.assertFalse(any('"api_book"' in query["sql"] for query in ctx.captured_queries))
+
+    def test_writes_keep_the_summary_current(self):
+        book = Book.objects.first()
+        book.publication_year = 1990
+        book.save()
+        Book.objects.filter(publication_year=2001).first().delete()
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('book-bulk-create'),
+                         [{"title": "New", "publication_year": 2005, "author": self.authors[2].id}], format="json")
+        moved = Book.objects.filter(author=self.authors[0])[:2]
+        self.client.patch(reverse('book-bulk-update'),
+                          [{"id": b.id, "author": self.authors[2].id} for b in moved], format="json")
+        self.authors[1].delete()
+        self.assertEqual(self.client.get(self.url).data, self.expected())
+
+    def test_rebuild_command_repairs_drift(self):
+        AuthorYearSummary.objects.all().delete()
+        out = io.StringIO()
+        call_command("rebuild_book_aggregates", stdout=out)
+        self.assertIn("into 6 (author, year) rows", out.getvalue())
+        self.assertEqual(self.client.get(self.url).data, self.expected())
+
+
+@skipUnless(msgpack and cbor2, "msgpack and cbor2 are optional")
+class BookBinaryFormatTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.author = Author.objects.create(name="Author")
+        for i in range(3):
+            Book.objects.create(title=f"Bøøk {i}", publication_year=2000 + i, author=self.author)
+        self.url = reverse('book-list')
+
+    def test_json_stays_the_default(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="*/*")
+        self.assertEqual(response["Content-Type"], "application/json")
+
+    def test_binary_formats_carry_the_json_data(self):
+        expected = json.loads(self.client.get(self.url).content)
+        for accept, loads in (("application/msgpack", msgpack.unpackb), ("application/cbor", cbor2.loads)):
+            response = self.client.get(self.url, HTTP_ACCEPT=accept)
+            self.assertEqual(response["Content-Type"], accept)
+            self.assertEqual(loads(response.content), expected)
+        response = self.client.get(self.url, {"format": "msgpack"})
+        self.assertEqual(msgpack.unpackb(response.content), expected)
+
+    def test_binary_request_bodies(self):
+        self.client.force_authenticate(user=self.user)
+        item = {"title": "Packed", "publication_year": 2010, "author": self.author.id}
+        response = self.client.post(reverse('book-create'), msgpack.packb(item), content_type="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('book-bulk-create'), cbor2.dumps([item, item]),
+                                    content_type="application/cbor")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Book.objects.filter(title="Packed").count(), 3)
+        response = self.client.post(reverse('book-create'), b"\xc1", content_type="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
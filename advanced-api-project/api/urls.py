@@ -5,6 +5,17 @@ from .views import (
     BookUpdateView,
     BookDeleteView,
     BookDetailView,
+    BookBatchView,
+    BookExportView,
+    BookBulkCreateView,
+    BookBulkUpdateView,
+    BookBulkDeleteView,
+    BookAggregatesView,
+    BookChangesView,
+    BookImportView,
+    ImportJobDetailView,
+    AuthorListView,
+    AuthorDetailView,
 )
 
 urlpatterns = [
@@ -13,4 +24,15 @@ urlpatterns = [
     path('books/update/<int:pk>/', BookUpdateView.as_view(), name='book-update'),
     path('books/delete/<int:pk>/', BookDeleteView.as_view(), name='book-delete'),
     path('books/<int:pk>/', BookDetailView.as_view(), name='book-detail'),
+    path('books/batch/', BookBatchView.as_view(), name='book-batch'),
+    path('books/export/<str:export_format>/', BookExportView.as_view(), name='book-export'),
+    path('books/bulk/create/', BookBulkCreateView.as_view(), name='book-bulk-create'),
+    path('books/bulk/update/', BookBulkUpdateView.as_view(), name='book-bulk-update'),
+    path('books/bulk/delete/', BookBulkDeleteView.as_view(), name='book-bulk-delete'),
+    path('books/aggregates/', BookAggregatesView.as_view(), name='book-aggregates'),
+    path('books/changes/', BookChangesView.as_view(), name='book-changes'),
+    path('books/import/', BookImportView.as_view(), name='book-import'),
+    path('books/import/<int:pk>/', ImportJobDetailView.as_view(), name='import-job-detail'),
+    path('authors/', AuthorListView.as_view(), name='author-list'),
+    path('authors/<int:pk>/', AuthorDetailView.as_view(), name='author-detail'),
 ]
\ No newline at end of file
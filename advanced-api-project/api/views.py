@@ -12,47 +12,352 @@ Views for Book API
 Customizations:
 - Permissions enforced per HTTP method.
 - Filtering support (year, author).
+- Typo-tolerant, ranked search from a trigram index (see api/search.py).
+- Streaming NDJSON/CSV export with the list's filters (BookExportView).
+- Feed import: queued by BookImportView and run by `import_books --queued`;
+  streamed, parsed in a process pool, resumable.
+- List and detail GETs read .values() rows instead of building model
+  instances and running BookSerializer (see BookValuesMixin).
+- BookListView responses are cached per canonical query string and
+  invalidated by a version counter on every write (see api/cache.py).
+- Bulk create/update/delete endpoints taking JSON arrays, written in one
+  transaction (see BookBulkMixin).
+- Author list/detail with a prefetched preview of each author's books.
+- Batch lookup of many books by id in one query (BookBatchView).
+- Per-year and per-author book counts from a summary table kept current
+  on every write (BookAggregatesView, see api/aggregates.py).
+- A change feed of book and author writes, with tombstones for deletes
+  (BookChangesView, see api/changes.py).
+- Conditional GETs (ETag/Last-Modified) on the book detail, answered with a
+  304 from Book.updated_at alone.
 """
 
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import generics, permissions, filters 
-from .models import Book
-from .serializers import BookSerializer
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import generics, permissions, filters, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from .models import Author, Book, ImportJob
+from .serializers import AuthorSerializer, BookSerializer, ImportJobSerializer, values_fields
+from .pagination import BookCursorPagination
+from .cache import bump_version, get_or_compute, list_key
+from .search import TrigramSearchFilter, index_books
+from . import aggregates, changes, export, feeds, importer, signals
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework 
 
+class BookValuesMixin:
+    """
+    Read-only fast path for views whose serializer only has plain column
+    fields (see serializers.values_fields): rows come from .values() in the
+    serializer's field order and go straight to the renderer, so no model
+    instances or serializer fields are built per row. The response body is
+    the same as the serializer path; any other serializer uses that path.
+
+    GETs also take sparse fieldsets and expansions:
+    - ?fields=id,title selects (and outputs) only those columns.
+    - ?expand=author nests {"id", "name"} instead of the author id; the
+      authors of a whole page are loaded with one query.
+    """
+    values_fast_path = True
+    fields_param = 'fields'
+    expand_param = 'expand'
+    field_selection_methods = ('GET', 'HEAD')
+
+    def _param_list(self, name):
+        value = self.request.query_params.get(name, '')
+        return [part.strip() for part in value.split(',') if part.strip()]
+
+    def get_field_selection(self):
+        """(field names to output or None for all, names to expand)."""
+        if not hasattr(self, '_field_selection'):
+            self._field_selection = self._parse_field_selection()
+        return self._field_selection
+
+    def _parse_field_selection(self):
+        if getattr(self, 'request', None) is None or self.request.method not in self.field_selection_methods:
+            return None, ()
+        available = list(self.get_serializer_class()().fields)
+        fields, expand = self._param_list(self.fields_param), self._param_list(self.expand_param)
+        errors = {}
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            errors[self.fields_param] = [f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(available)}."]
+        expandable = list(getattr(self.get_serializer_class(), 'expandable_fields', {}))
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            errors[self.expand_param] = [f"Cannot expand: {', '.join(unknown)}. Choose from: {', '.join(expandable)}."]
+        if errors:
+            raise ValidationError(errors)
+        selected = [name for name in available if name in fields] if fields else None
+        return selected, tuple(name for name in expand if selected is None or name in selected)
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_field_selection()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        if expand:
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.get_values_fields() is not None:
+            return queryset
+        # serializer path: still only load the selected columns
+        fields, expand = self.get_field_selection()
+        if fields is not None:
+            queryset = queryset.only(*fields)
+        if expand:
+            queryset = queryset.prefetch_related(*expand)
+        return queryset
+
+    def get_values_fields(self):
+        if not self.values_fast_path:
+            return None
+        names = values_fields(self.get_serializer_class())
+        fields, _ = self.get_field_selection()
+        if names is None or fields is None:
+            return names
+        return tuple(name for name in names if name in fields)
+
+    def expand_rows(self, rows):
+        """Replace the pks of expanded fields with nested rows, one query per field."""
+        _, expand = self.get_field_selection()
+        serializer_class = self.get_serializer_class()
+        for name in expand:
+            nested = serializer_class.expandable_fields[name]
+            model = nested.Meta.model
+            pks = {row[name] for row in rows if row[name] is not None}
+            objects = {obj['id']: obj for obj in model.objects.filter(pk__in=pks).values(*values_fields(nested))}
+            for row in rows:
+                row[name] = objects.get(row[name])
+        return rows
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_values_fields()
+        if fields is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).values(*fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.expand_rows(page))
+        return Response(self.expand_rows(list(queryset)))
+
+    def retrieve(self, request, *args, **kwargs):
+        fields = self.get_values_fields()
+        if fields is None:
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).values(*fields)
+        row = generics.get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, row)
+        return Response(self.expand_rows([row])[0])
+
+
 # Book CRUD Views
 
-class BookListView(generics.ListAPIView):
+class BookFilterMixin:
+    """Filtering, search and ordering shared by the book list and the export."""
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter, filters.OrderingFilter]
+    filterset_fields = ['title', 'author', 'publication_year']  # Filtering
+    search_fields = ['title', 'author__name']  # Searching (trigram index, see api/search.py)
+    ordering_fields = ['title', 'publication_year']  # Ordering
+    default_ordering = 'title'
+
+    @property
+    def ordering(self):
+        # Default ordering: best matches first while searching
+        request = getattr(self, 'request', None)
+        if request is not None and request.query_params.get(TrigramSearchFilter.search_param):
+            return ['-search_rank']
+        return [self.default_ordering]
+
+
+class BookListView(BookFilterMixin, BookValuesMixin, generics.ListAPIView):
     """
     GET /api/books/?title=xyz&author=1&publication_year=2020
-    GET /api/books/?search=Harry
+    GET /api/books/?search=Hary Poter   (trigram search: typo tolerant, best matches first)
     GET /api/books/?ordering=title
     GET /api/books/?ordering=-publication_year
+    GET /api/books/?page_size=50&cursor=<next cursor>
+
+    Results are cursor-paginated on (ordering field, id), see api/pagination.py.
+    Responses are cached per canonical query (X-Book-Cache: HIT/MISS/WAIT),
+    see api/cache.py.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = BookCursorPagination
 
-    # ✅ Enable filtering, searching, ordering
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['title', 'author', 'publication_year']  # Filtering
-    search_fields = ['title', 'author__name']  # Searching
-    ordering_fields = ['title', 'publication_year']  # Ordering
-    ordering = ['title']  # Default ordering
+    # ✅ Filtering, searching, ordering come from BookFilterMixin
+
+    def list(self, request, *args, **kwargs):
+        # parameters equal to these defaults don't change the response
+        defaults = {
+            'ordering': self.ordering[0],
+            self.pagination_class.page_size_query_param: str(self.pagination_class.page_size),
+        }
+        data, state = get_or_compute(
+            list_key(request, defaults),
+            lambda: super(BookListView, self).list(request, *args, **kwargs).data,
+        )
+        response = Response(data)
+        response['X-Book-Cache'] = state
+        return response
+
+
+class BookExportView(BookFilterMixin, BookValuesMixin, generics.GenericAPIView):
+    """
+    GET /api/books/export/ndjson/?author=1&fields=id,title
+    GET /api/books/export/csv/?search=potter
+
+    Streams every matching book, one NDJSON line or CSV row each, without
+    pagination; takes the same filters, search, ordering and ?fields= as the
+    book list (?expand= is not supported). Default order is by id.
+    Memory stays flat on any table size (see api/export.py).
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    permission_classes = [permissions.AllowAny]
+    default_ordering = 'id'
+    chunk_size = 2000
+
+    def perform_content_negotiation(self, request, force=False):
+        # the body is NDJSON/CSV whatever the Accept header says;
+        # the renderer is only used for error responses
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, export_format, *args, **kwargs):
+        if export_format not in export.FORMATS:
+            raise NotFound(f"Unknown export format, choose from: {', '.join(export.FORMATS)}.")
+        fields, _ = self.get_field_selection()
+        fields = fields or values_fields(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            export.export_lines(queryset, fields, export_format, self.chunk_size),
+            content_type=export.FORMATS[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="books.{export_format}"'
+        return response
 
 
-class BookDetailView(generics.RetrieveAPIView):
+def book_updated_at(request, pk):
+    """The book's updated_at from one primary key lookup, memoized on the request."""
+    if not hasattr(request, '_book_updated_at'):
+        request._book_updated_at = None
+        # ?expand=author embeds the author, whose changes don't touch the book
+        if not request.query_params.get(BookValuesMixin.expand_param):
+            request._book_updated_at = Book.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    return request._book_updated_at
+
+
+def book_etag(request, pk):
+    updated_at = book_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    # one ETag per representation: ?fields= and the negotiated format change the body
+    variant = f"{request.query_params.get(BookValuesMixin.fields_param, '')}|{request.accepted_renderer.format}"
+    return f'{pk}-{updated_at.timestamp()}-{hashlib.md5(variant.encode()).hexdigest()[:8]}'
+
+
+def book_last_modified(request, pk):
+    return book_updated_at(request, pk)
+
+
+@method_decorator(condition(book_etag, book_last_modified), name='get')
+class BookDetailView(BookValuesMixin, generics.RetrieveAPIView):
     """
     GET: Retrieve a single book by ID.
     Read-only, no authentication required.
+    Sends ETag/Last-Modified from Book.updated_at; a request whose
+    If-None-Match/If-Modified-Since still matches gets a 304 after a single
+    lookup of that column, without loading or serializing the book.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.AllowAny]
 
 
+class BookBatchView(BookValuesMixin, generics.GenericAPIView):
+    """
+    GET  /api/books/batch/?ids=3,1,2
+    POST /api/books/batch/ with [3, 1, 2] or {"ids": [3, 1, 2]}
+
+    Look up many books by id with one `IN` query instead of one detail
+    request each. Returns {"results": [...], "missing": [...]}: the books in
+    the requested order (repeated ids once) and the ids that don't exist.
+    Takes ?fields= and ?expand= like the detail view. At most
+    settings.BOOK_BATCH_MAX_IDS ids per request. POST only reads, for id
+    lists too long for a URL. No authentication required.
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    permission_classes = [permissions.AllowAny]
+    field_selection_methods = ('GET', 'HEAD', 'POST')
+    ids_param = 'ids'
+
+    def get_max_ids(self):
+        return getattr(settings, 'BOOK_BATCH_MAX_IDS', 100)
+
+    def get_ids(self, request):
+        if request.method == 'POST':
+            ids = request.data.get(self.ids_param) if isinstance(request.data, dict) else request.data
+            if not isinstance(ids, list) or not all(is_id(pk) for pk in ids):
+                raise ValidationError({self.ids_param: ['Expected a list of integer ids.']})
+        else:
+            try:
+                ids = [int(part) for part in self._param_list(self.ids_param)]
+            except ValueError:
+                ids = None
+            if ids is None or not all(is_id(pk) for pk in ids):
+                raise ValidationError({self.ids_param: ['Expected comma-separated integer ids.']})
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise ValidationError({self.ids_param: ['This field is required.']})
+        max_ids = self.get_max_ids()
+        if len(ids) > max_ids:
+            raise ValidationError({self.ids_param: [f'At most {max_ids} ids per request, got {len(ids)}.']})
+        return ids
+
+    def lookup(self, request):
+        ids = self.get_ids(request)
+        queryset = self.get_queryset().filter(pk__in=ids)
+        fields = self.get_values_fields()
+        if fields is None:
+            books = queryset.in_bulk()
+            results = self.get_serializer([books[pk] for pk in ids if pk in books], many=True).data
+        else:
+            # the id puts the rows back in the requested order, even when ?fields= leaves it out
+            extra = () if 'id' in fields else ('id',)
+            books = {row['id']: row for row in queryset.values(*fields, *extra)}
+            results = self.expand_rows([books[pk] for pk in ids if pk in books])
+            for row in results:
+                for name in extra:
+                    del row[name]
+        return Response({'results': results, 'missing': [pk for pk in ids if pk not in books]})
+
+    def get(self, request, *args, **kwargs):
+        return self.lookup(request)
+
+    def post(self, request, *args, **kwargs):
+        return self.lookup(request)
+
+
 class BookCreateView(generics.CreateAPIView):
     """
     POST: Create a new book.
@@ -81,3 +386,302 @@ class BookDeleteView(generics.DestroyAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticated]
+
+
+# Author Views
+
+class AuthorQuerysetMixin:
+    queryset = Author.objects.all()
+    serializer_class = AuthorSerializer
+    permission_classes = [permissions.AllowAny]
+    books_preview_size = 5
+
+    def get_queryset(self):
+        return AuthorSerializer.setup_eager_loading(super().get_queryset(), self.books_preview_size)
+
+
+class AuthorListView(AuthorQuerysetMixin, generics.ListAPIView):
+    """
+    GET /api/authors/?search=Rowling&ordering=-name
+
+    Each author carries its first few books by title, books_count and a
+    books_next link to the rest (the book list filtered by author).
+    Cursor-paginated like the book list; a page costs two queries.
+    """
+    pagination_class = BookCursorPagination
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['name']
+    ordering_fields = ['name']
+    ordering = ['name']
+
+
+class AuthorDetailView(AuthorQuerysetMixin, generics.RetrieveAPIView):
+    """
+    GET: Retrieve a single author with a preview of their books.
+    Read-only, no authentication required.
+    """
+
+
+# Bulk Book Views
+
+def is_id(value):
+    # an int the database can store in a BigAutoField; bigger ones overflow
+    # the driver instead of simply matching no row
+    return isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63
+
+
+class BookBulkMixin:
+    """
+    Bulk endpoints take a JSON array, validate every item before writing
+    anything and do all the writes in one transaction, so a batch is applied
+    entirely or not at all. Invalid batches get a 400 whose body maps the
+    index of every failing item to its errors, the same shape as DRF's
+    ListSerializer errors, e.g. {"1": {"publication_year": [...]}}.
+    Batches are capped at settings.BOOK_BULK_MAX_ITEMS items.
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_max_items(self):
+        return getattr(settings, 'BOOK_BULK_MAX_ITEMS', 1000)
+
+    def get_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ['Expected a list of items.']})
+        max_items = self.get_max_items()
+        if len(items) > max_items:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [f'At most {max_items} items per request, got {len(items)}.']
+            })
+        return items
+
+
+class BookBulkCreateView(BookBulkMixin, generics.GenericAPIView):
+    """
+    POST: Create many books, e.g. [{"title": ..., "publication_year": ..., "author": 1}, ...].
+    Returns the created books in input order.
+    Requires authentication.
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=self.get_items(request), many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            books = Book.objects.bulk_create(Book(**attrs) for attrs in serializer.validated_data)
+            bump_version()  # bulk_create sends no post_save
+            index_books(book.pk for book in books)
+            changes.record('book', (book.pk for book in books))
+            aggregates.apply(aggregates.book_keys(books))
+        return Response(self.get_serializer(books, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class BookBulkUpdateView(BookBulkMixin, generics.GenericAPIView):
+    """
+    PUT/PATCH: Update many books, e.g. [{"id": 1, "title": ...}, ...].
+    Every item needs the id of an existing book; PATCH items may leave fields out.
+    Returns the updated books in input order.
+    Requires authentication.
+    """
+
+    def update(self, request, partial):
+        items = self.get_items(request)
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        books = self.get_queryset().in_bulk([pk for pk in ids if is_id(pk)])
+
+        # resolve every referenced author once for the whole batch
+        context = self.get_serializer_context()
+        context.update(self.get_serializer().batch_context(items))
+
+        serializers, errors, seen = [], {}, set()
+        for index, (item, pk) in enumerate(zip(items, ids)):
+            if not isinstance(item, dict):
+                errors[index] = {api_settings.NON_FIELD_ERRORS_KEY: ['Expected an object.']}
+            elif not is_id(pk) or pk not in books:
+                errors[index] = {'id': ['No book with this id.']}
+            elif pk in seen:
+                errors[index] = {'id': ['Duplicate id in this batch.']}
+            else:
+                seen.add(pk)
+                serializer = self.get_serializer_class()(books[pk], data=item, partial=partial, context=context)
+                if not serializer.is_valid():
+                    errors[index] = serializer.errors
+                serializers.append(serializer)
+        if errors:
+            raise ValidationError(errors)
+
+        fields = set()
+        now = timezone.now()
+        # the (author, year) cells of the aggregates the books move out of
+        deltas = Counter()
+        deltas.subtract(aggregates.book_keys(serializer.instance for serializer in serializers))
+        for serializer in serializers:
+            for attr, value in serializer.validated_data.items():
+                setattr(serializer.instance, attr, value)
+                fields.add(attr)
+            # bulk_update skips auto_now; the detail view's ETag depends on it
+            serializer.instance.updated_at = now
+        updated = [serializer.instance for serializer in serializers]
+        if fields:
+            fields.add('updated_at')
+            with transaction.atomic():
+                Book.objects.bulk_update(updated, sorted(fields))
+                bump_version()
+                index_books(book.pk for book in updated)
+                changes.record('book', (book.pk for book in updated))
+                deltas.update(aggregates.book_keys(updated))
+                aggregates.apply(deltas)
+        return Response(self.get_serializer(updated, many=True).data)
+
+    def put(self, request, *args, **kwargs):
+        return self.update(request, partial=False)
+
+    def patch(self, request, *args, **kwargs):
+        return self.update(request, partial=True)
+
+
+class BookBulkDeleteView(BookBulkMixin, generics.GenericAPIView):
+    """
+    DELETE: Remove many books by id, e.g. [1, 2, 3].
+    Returns one {"id": ..., "status": "deleted" | "not_found"} per id.
+    Requires authentication.
+    """
+
+    def delete(self, request, *args, **kwargs):
+        ids = self.get_items(request)
+        errors = {index: {'id': ['A valid integer is required.']}
+                  for index, pk in enumerate(ids) if not is_id(pk)}
+        if errors:
+            raise ValidationError(errors)
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(pk__in=ids)
+            rows = list(queryset.values_list('pk', 'author_id', 'publication_year'))
+            # one round of bookkeeping for the batch, not one per row
+            with signals.bulk_delete():
+                queryset.delete()
+            bump_version()
+            changes.record('book', (pk for pk, _, _ in rows), deleted=True)
+            aggregates.apply({key: -n for key, n in Counter((a, y) for _, a, y in rows).items()})
+        found = {pk for pk, _, _ in rows}
+        return Response([
+            {'id': pk, 'status': 'deleted' if pk in found else 'not_found'} for pk in ids
+        ])
+
+
+# Reporting Views
+
+class BookAggregatesView(generics.GenericAPIView):
+    """
+    GET /api/books/aggregates/
+
+    {"books_per_year": [{"publication_year", "books"}, ...],
+     "authors": [{"author", "name", "books", "min_year", "max_year"}, ...]}
+    grouped from the AuthorYearSummary table, never the book table (see
+    api/aggregates.py). Read-only, no authentication required.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'books_per_year': aggregates.books_per_year(),
+            'authors': aggregates.books_per_author(),
+        })
+
+
+# Change Feed Views
+
+class BookChangesView(generics.GenericAPIView):
+    """
+    GET /api/books/changes/?since=<seq>
+
+    The books and authors written after sequence number `since` (0 for
+    everything), oldest change first, each once with its current row or as
+    a tombstone: {"seq", "type": "book" | "author", "id", "deleted", "data"}.
+    Store the returned "seq" and pass it as `since` next time; "next" links
+    to the rest while there is more. A `since` older than the last tombstone
+    compaction gets a 410: the client may have missed deletes and must
+    download the catalogue again. Read-only, no authentication required.
+    """
+    permission_classes = [permissions.AllowAny]
+    since_param = 'since'
+    page_size_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+
+    def get_int_param(self, name, default, minimum):
+        value = self.request.query_params.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValidationError({name: ['A valid integer is required.']})
+        if value < minimum:
+            raise ValidationError({name: [f'Ensure this value is greater than or equal to {minimum}.']})
+        return value
+
+    def get(self, request, *args, **kwargs):
+        since = self.get_int_param(self.since_param, 0, 0)
+        page_size = min(self.get_int_param(self.page_size_param, self.page_size, 1), self.max_page_size)
+        if 0 < since < changes.compacted_seq():
+            return Response(
+                {'detail': 'Changes since this sequence number were compacted; download the catalogue again.'},
+                status=status.HTTP_410_GONE,
+            )
+        results = changes.changes_since(since, page_size + 1)
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        seq = results[-1]['seq'] if results else since
+        next_url = replace_query_param(request.build_absolute_uri(), self.since_param, seq) if has_more else None
+        return Response({'seq': seq, 'next': next_url, 'results': results})
+
+
+# Feed Import Views
+
+class BookImportView(generics.GenericAPIView):
+    """
+    POST /api/books/import/ (multipart): file=<feed.ndjson|feed.csv>
+    Optional fields: feed_format (else taken from the file name) and job=<id>
+    to resume a failed import with the same file.
+    Stores the feed and queues the import for ``manage.py import_books
+    --queued`` (see api/importer.py); answers 202 with the job, whose
+    progress is reported by import-job-detail.
+    Requires authentication.
+    """
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['No file was submitted.']})
+        job = None
+        if request.data.get('job'):
+            job = generics.get_object_or_404(self.get_queryset(), pk=request.data['job'])
+            if job.status == 'done':
+                return Response(self.get_serializer(job).data)
+            if job.status != 'failed':
+                raise ValidationError({'job': [f'Import {job.pk} is still {job.status}.']})
+        feed_format = request.data.get('feed_format') or upload.name.rsplit('.', 1)[-1].lower()
+        if job is None and feed_format not in feeds.FORMATS:
+            raise ValidationError({'feed_format': [f"Choose from: {', '.join(feeds.FORMATS)}."]})
+
+        job = importer.queue_import(
+            upload, feed_format, job=job, chunk_size=getattr(settings, 'BOOK_IMPORT_CHUNK_SIZE', 1000),
+        )
+        if getattr(settings, 'BOOK_IMPORT_SYNC', False):
+            job = importer.run_queued_import(job, workers=getattr(settings, 'BOOK_IMPORT_WORKERS', 2))
+        location = reverse('import-job-detail', args=[job.pk], request=request)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED,
+                        headers={'Location': location})
+
+
+class ImportJobDetailView(generics.RetrieveAPIView):
+    """
+    GET: Progress report of a feed import.
+    Requires authentication.
+    """
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
@@ -0,0 +1,39 @@
+"""
+Parsers for MessagePack and CBOR request bodies
+(``Content-Type: application/msgpack`` / ``application/cbor``), the
+counterpart of api/renderers.py. The decoded data is validated by the
+serializers like a JSON body. They need the optional msgpack and cbor2
+packages.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+try:
+    import msgpack
+except ImportError:  # optional dependency, MessagePackParser needs it
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional dependency, CBORParser needs it
+    cbor2 = None
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc or type(exc).__name__}')
+
+
+class CBORParser(BaseParser):
+    media_type = 'application/cbor'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return cbor2.loads(stream.read())
+        except (ValueError, cbor2.CBORDecodeError) as exc:
+            raise ParseError(f'CBOR parse error - {exc}')
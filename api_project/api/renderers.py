@@ -0,0 +1,48 @@
+"""
+MessagePack and CBOR renderers, for clients that ask for them with
+``Accept: application/msgpack`` / ``application/cbor`` (or ?format=msgpack /
+?format=cbor). JSON stays the default. Values a format has no type for are
+converted by DRF's JSONEncoder, as in a JSON body. They need the optional
+msgpack and cbor2 packages, and settings only registers them when those are
+installed.
+"""
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # optional dependency, MessagePackRenderer needs it
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional dependency, CBORRenderer needs it
+    cbor2 = None
+
+
+def _json_default(obj):
+    return JSONEncoder().default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_json_default, use_bin_type=True)
+
+
+class CBORRenderer(BaseRenderer):
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data, default=lambda encoder, obj: encoder.encode(_json_default(obj)))
@@ -1,3 +1,48 @@
-from django.test import TestCase
+import json
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import Book
+from .parsers import cbor2, msgpack
+
+
+@skipUnless(msgpack and cbor2, "needs the optional msgpack and cbor2 packages")
+class BinaryFormatTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="pass")
+        self.client.force_authenticate(user=self.user)
+        Book.objects.create(title="Bøøk", author="Ånne")
+        self.url = reverse('book_all-list')
+
+    def test_json_stays_the_default(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="*/*")
+        self.assertEqual(response["Content-Type"], "application/json")
+
+    def test_accept_header_picks_the_binary_format(self):
+        expected = json.loads(self.client.get(self.url, HTTP_ACCEPT="application/json").content)
+        for accept, loads in (("application/msgpack", msgpack.unpackb), ("application/cbor", cbor2.loads)):
+            response = self.client.get(self.url, HTTP_ACCEPT=accept)
+            self.assertEqual(response["Content-Type"], accept)
+            self.assertEqual(loads(response.content), expected)
+
+    def test_binary_request_bodies_round_trip(self):
+        for content_type, dumps, loads in (
+            ("application/msgpack", msgpack.packb, msgpack.unpackb),
+            ("application/cbor", cbor2.dumps, cbor2.loads),
+        ):
+            item = {"title": f"Packed as {content_type}", "author": "Ünïcode"}
+            response = self.client.post(self.url, dumps(item), content_type=content_type, HTTP_ACCEPT=content_type)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            created = loads(response.content)
+            self.assertEqual({k: created[k] for k in item}, item)
+            self.assertTrue(Book.objects.filter(pk=created["id"], **item).exists())
+
+    def test_malformed_bodies_are_a_400(self):
+        for content_type, body in (("application/msgpack", b"\xc1"), ("application/cbor", b"\xff")):
+            response = self.client.post(self.url, body, content_type=content_type)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("parse error", response.data["detail"])
@@ -0,0 +1,83 @@
+"""
+Fragment cache for the post cards shown on the list pages.
+
+Each card is cached under ``blog:card:<pk>`` together with a stamp of the
+row it was rendered from (updated_at, comment_count). A page of cards is
+fetched with one ``get_many``; entries whose stamp no longer matches are
+treated as misses, re-rendered and written back with one ``set_many``.
+The signal receivers in blog/signals.py delete cards when a post, its
+comments or its tags change. Hits and misses are counted in the cache.
+"""
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'blog/post_card.html'
+CARD_TIMEOUT = 60 * 60 * 24
+HITS_KEY = 'blog:card:hits'
+MISSES_KEY = 'blog:card:misses'
+
+
+def card_key(post_id):
+    return f'blog:card:{post_id}'
+
+
+def card_stamp(post):
+    return (post.updated_at.isoformat() if post.updated_at else '', post.comment_count)
+
+
+def invalidate(*post_ids):
+    cache.delete_many([card_key(pk) for pk in post_ids])
+
+
+def _count(key, n):
+    if not n:
+        return
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, n)
+    except ValueError:
+        # evicted between add() and incr()
+        cache.set(key, n, timeout=None)
+
+
+def render_cards(posts):
+    """Return [(post, card_html), ...] for `posts`, in order."""
+    posts = list(posts)
+    cached = cache.get_many([card_key(post.pk) for post in posts])
+    cards, missed = {}, []
+    for post in posts:
+        entry = cached.get(card_key(post.pk))
+        if entry is not None and entry[0] == card_stamp(post):
+            cards[post.pk] = entry[1]
+        else:
+            missed.append(post)
+
+    if missed:
+        prefetch_related_objects(missed, 'author', 'tags')
+        fresh = {}
+        for post in missed:
+            html = render_to_string(CARD_TEMPLATE, {'post': post})
+            cards[post.pk] = html
+            fresh[card_key(post.pk)] = (card_stamp(post), html)
+        cache.set_many(fresh, timeout=CARD_TIMEOUT)
+
+    _count(HITS_KEY, len(posts) - len(missed))
+    _count(MISSES_KEY, len(missed))
+    return [(post, mark_safe(cards[post.pk])) for post in posts]
+
+
+def stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
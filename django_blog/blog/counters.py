@@ -0,0 +1,43 @@
+"""
+Denormalized counters: Post.comment_count and Tag.post_count.
+
+The signal receivers in blog/signals.py keep them current with single-row
+F() updates; the functions here recompute them from scratch to repair drift.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Post, Comment, Tag
+
+
+# clamped at 0: a drifted counter must not fail the column's CHECK constraint
+
+def bump_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(comment_count=Greatest(F('comment_count') + delta, 0))
+
+
+def bump_post_count(tag_ids, delta):
+    Tag.objects.filter(pk__in=list(tag_ids)).update(post_count=Greatest(F('post_count') + delta, 0))
+
+
+def recount_comments():
+    comments = (
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(n=Count('pk')).values('n')
+    )
+    return Post.objects.update(comment_count=Coalesce(Subquery(comments), 0))
+
+
+def recount_tags():
+    through = Tag.posts.through
+    posts = (
+        through.objects.filter(tag=OuterRef('pk'))
+        .order_by().values('tag').annotate(n=Count('pk')).values('n')
+    )
+    return Tag.objects.update(post_count=Coalesce(Subquery(posts), 0))
+
+
+@transaction.atomic
+def recount_all():
+    return recount_comments(), recount_tags()
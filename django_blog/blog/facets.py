@@ -0,0 +1,289 @@
+"""
+In-memory facet index for filtering the feed by tag and author.
+
+Every tag and every author maps to a compressed bitmap of post ids. The
+bitmaps are roaring-style: ids are split into 65536-wide chunks and only
+non-empty chunks are stored, each as a Python int used as a bitset, so AND,
+OR and popcount run in C over a few machine words per chunk. Post ids grow
+with date_posted, so walking a result bitmap from the highest id down gives
+the feed order and a page only needs `limit` ids. Drafts are not indexed.
+
+The index is built lazily on first use (no queries at import/app-ready time)
+and updated from the signal receivers in blog/signals.py after each commit.
+Other processes notice writes through a version counter in the cache and
+rebuild their copy on their next query.
+"""
+import threading
+
+from django.core.cache import cache
+
+from .models import Post, Tag
+
+VERSION_KEY = 'blog:facets:version'
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+class Bitmap:
+    """Set of non-negative ints stored as {chunk number: int bitset}."""
+
+    __slots__ = ('chunks',)
+
+    def __init__(self, values=(), chunks=None):
+        self.chunks = dict(chunks) if chunks else {}
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        high = value >> CHUNK_BITS
+        self.chunks[high] = self.chunks.get(high, 0) | (1 << (value & CHUNK_MASK))
+
+    def discard(self, value):
+        high = value >> CHUNK_BITS
+        bits = self.chunks.get(high, 0) & ~(1 << (value & CHUNK_MASK))
+        if bits:
+            self.chunks[high] = bits
+        else:
+            self.chunks.pop(high, None)
+
+    def __contains__(self, value):
+        return bool(self.chunks.get(value >> CHUNK_BITS, 0) >> (value & CHUNK_MASK) & 1)
+
+    def __len__(self):
+        return sum(bits.bit_count() for bits in self.chunks.values())
+
+    def __bool__(self):
+        return bool(self.chunks)
+
+    def __and__(self, other):
+        small, large = sorted((self.chunks, other.chunks), key=len)
+        chunks = {}
+        for high, bits in small.items():
+            both = bits & large.get(high, 0)
+            if both:
+                chunks[high] = both
+        return Bitmap(chunks=chunks)
+
+    def __or__(self, other):
+        chunks = dict(self.chunks)
+        for high, bits in other.chunks.items():
+            chunks[high] = chunks.get(high, 0) | bits
+        return Bitmap(chunks=chunks)
+
+    def intersection_count(self, other):
+        small, large = sorted((self.chunks, other.chunks), key=len)
+        return sum((bits & large.get(high, 0)).bit_count() for high, bits in small.items())
+
+    def iter_desc(self, below=None):
+        """Yield members in descending order, optionally only those < below."""
+        for high in sorted(self.chunks, reverse=True):
+            bits = self.chunks[high]
+            if below is not None:
+                if high > below >> CHUNK_BITS:
+                    continue
+                if high == below >> CHUNK_BITS:
+                    bits &= (1 << (below & CHUNK_MASK)) - 1
+            base = high << CHUNK_BITS
+            while bits:
+                top = bits.bit_length() - 1
+                yield base | top
+                bits ^= 1 << top
+
+    def iter_asc(self, above=None):
+        """Yield members in ascending order, optionally only those > above."""
+        for high in sorted(self.chunks):
+            bits = self.chunks[high]
+            if above is not None:
+                if high < above >> CHUNK_BITS:
+                    continue
+                if high == above >> CHUNK_BITS:
+                    bits &= ~((2 << (above & CHUNK_MASK)) - 1)
+            base = high << CHUNK_BITS
+            while bits:
+                low = bits & -bits
+                yield base | (low.bit_length() - 1)
+                bits ^= low
+
+
+def _union(bitmaps):
+    result = Bitmap()
+    for bitmap in bitmaps:
+        result = result | bitmap
+    return result
+
+
+class FacetIndex:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.version = None
+        self.posts = Bitmap()
+        self.tags = {}
+        self.authors = {}
+        self._post_author = {}
+
+    # loading
+
+    def load(self):
+        with self._lock:
+            version = cache.get(VERSION_KEY, 0)
+            posts, tags, authors, post_author = Bitmap(), {}, {}, {}
+            # drafts are left out; tag bitmaps may hold them, every query ANDs with `posts`
+            published = Post.objects.filter(published=True).values_list('id', 'author_id')
+            for post_id, author_id in published.iterator():
+                posts.add(post_id)
+                authors.setdefault(author_id, Bitmap()).add(post_id)
+                post_author[post_id] = author_id
+            through = Tag.posts.through.objects.values_list('tag_id', 'post_id')
+            for tag_id, post_id in through.iterator():
+                tags.setdefault(tag_id, Bitmap()).add(post_id)
+            self.posts, self.tags, self.authors = posts, tags, authors
+            self._post_author = post_author
+            self.version = version
+            self._loaded = True
+
+    def ensure_fresh(self):
+        if not self._loaded or cache.get(VERSION_KEY, 0) != self.version:
+            self.load()
+
+    def _changed(self, apply):
+        """Apply an incremental update, or fall back to a reload if stale."""
+        with self._lock:
+            if not self._loaded:
+                cache.add(VERSION_KEY, 0, timeout=None)
+                self._bump()
+                return
+            in_sync = cache.get(VERSION_KEY, 0) == self.version
+            if in_sync:
+                apply()
+            new_version = self._bump()
+            if in_sync and new_version == self.version + 1:
+                self.version = new_version
+            else:
+                self._loaded = False
+
+    def _bump(self):
+        cache.add(VERSION_KEY, 0, timeout=None)
+        try:
+            return cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, timeout=None)
+            return 1
+
+    # incremental updates
+
+    def add_post(self, post_id, author_id):
+        def apply():
+            old_author = self._post_author.get(post_id)
+            if old_author is not None and old_author != author_id:
+                self.authors[old_author].discard(post_id)
+            self.posts.add(post_id)
+            self.authors.setdefault(author_id, Bitmap()).add(post_id)
+            self._post_author[post_id] = author_id
+        self._changed(apply)
+
+    def _hide(self, post_id):
+        self.posts.discard(post_id)
+        author_id = self._post_author.pop(post_id, None)
+        if author_id is not None:
+            self.authors[author_id].discard(post_id)
+
+    def hide_post(self, post_id):
+        """Take an unpublished post out of the results; its tags are kept."""
+        self._changed(lambda: self._hide(post_id))
+
+    def remove_post(self, post_id):
+        def apply():
+            self._hide(post_id)
+            for bitmap in self.tags.values():
+                bitmap.discard(post_id)
+        self._changed(apply)
+
+    def tag_posts(self, tag_id, post_ids):
+        def apply():
+            bitmap = self.tags.setdefault(tag_id, Bitmap())
+            for post_id in post_ids:
+                bitmap.add(post_id)
+        self._changed(apply)
+
+    def untag_posts(self, tag_id, post_ids):
+        def apply():
+            bitmap = self.tags.get(tag_id)
+            if bitmap is not None:
+                for post_id in post_ids:
+                    bitmap.discard(post_id)
+        self._changed(apply)
+
+    def set_post_tags(self, post_id, added=(), removed=()):
+        def apply():
+            for tag_id in added:
+                self.tags.setdefault(tag_id, Bitmap()).add(post_id)
+            for tag_id in removed:
+                if tag_id in self.tags:
+                    self.tags[tag_id].discard(post_id)
+        self._changed(apply)
+
+    def clear_post_tags(self, post_id):
+        def apply():
+            for bitmap in self.tags.values():
+                bitmap.discard(post_id)
+        self._changed(apply)
+
+    def remove_tag(self, tag_id):
+        self._changed(lambda: self.tags.pop(tag_id, None))
+
+    # queries
+
+    def filter(self, all_tags=(), any_tags=(), authors=()):
+        """
+        Post ids tagged with every tag in `all_tags`, with at least one of
+        `any_tags` (if given) and written by one of `authors` (if given).
+        """
+        self.ensure_fresh()
+        with self._lock:
+            result = self.posts
+            for tag_id in all_tags:
+                result = result & self.tags.get(tag_id, Bitmap())
+            if any_tags:
+                result = result & _union(self.tags.get(t, Bitmap()) for t in any_tags)
+            if authors:
+                result = result & _union(self.authors.get(a, Bitmap()) for a in authors)
+            return result
+
+    def tag_counts(self, result):
+        """{tag_id: number of posts in `result` carrying the tag}, zeros dropped."""
+        with self._lock:
+            counts = {tag_id: result.intersection_count(bm) for tag_id, bm in self.tags.items()}
+        return {tag_id: n for tag_id, n in counts.items() if n}
+
+    def author_counts(self, result):
+        """{author_id: number of posts in `result` by the author}, zeros dropped."""
+        with self._lock:
+            counts = {a: result.intersection_count(bm) for a, bm in self.authors.items()}
+        return {a: n for a, n in counts.items() if n}
+
+
+def page(result, limit, after=None, before=None):
+    """
+    Ids for one feed page, newest first. `after` continues to older posts
+    (ids below it), `before` goes back to newer ones (ids above it).
+    Returns (ids, has_older, has_newer).
+    """
+    if before is not None:
+        ids = []
+        for post_id in result.iter_asc(above=before):
+            ids.append(post_id)
+            if len(ids) > limit:
+                break
+        has_newer = len(ids) > limit
+        return ids[:limit][::-1], True, has_newer
+    ids = []
+    for post_id in result.iter_desc(below=after):
+        ids.append(post_id)
+        if len(ids) > limit:
+            break
+    return ids[:limit], len(ids) > limit, after is not None
+
+
+index = FacetIndex()
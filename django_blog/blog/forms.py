@@ -1,8 +1,68 @@
 from django import forms
+from django.db.models.functions import Lower
+from django.utils.text import slugify
 from django.contrib.auth.models import User
 from .models import Profile
-from models import Post, Comment, Tag
-from taggit.forms import TagWidget 
+from .models import Post, Comment, Tag
+
+def _by_lower_name(names):
+    wanted = {}
+    for name in names:
+        wanted.setdefault(name.lower(), name)  # first spelling wins
+    return wanted
+
+
+def tag_name_errors(names):
+    """
+    Why resolve_tags() can't give some of `names` a tag of their own: the
+    name has no ASCII letters or digits for a slug, or its slug belongs to a tag
+    with a different name (`C++` and `C#` both slugify to `c`). One query.
+    """
+    by_slug, errors = {}, []
+    for name in _by_lower_name(names).values():
+        slug = slugify(name)
+        if not slug:
+            errors.append(f'"{name}" has no ASCII letters or digits to make its URL from.')
+        else:
+            by_slug.setdefault(slug, []).append(name)
+    owners = dict(Tag.objects.filter(slug__in=by_slug).values_list('slug', 'name'))
+    for slug, same_slug in by_slug.items():
+        owner = owners.get(slug, same_slug[0])
+        for name in same_slug:
+            if name.lower() != owner.lower():
+                errors.append(f'"{name}" clashes with the tag "{owner}" (both would be /tags/{slug}/).')
+    return errors
+
+
+def resolve_tags(names):
+    """
+    Map tag names to Tag rows case-insensitively, creating the missing ones.
+    Costs a constant number of queries however many names are given: one
+    lookup, one bulk insert (conflicts ignored, so a concurrent insert of the
+    same tag is harmless) and one lookup of the rows just inserted.
+    Raises ValidationError for names that can't get a tag of their own, see
+    tag_name_errors().
+    """
+    wanted = _by_lower_name(names)
+    if not wanted:
+        return []
+
+    found = {
+        tag.lname: tag
+        for tag in Tag.objects.annotate(lname=Lower('name')).filter(lname__in=wanted)
+    }
+    missing = {key: name for key, name in wanted.items() if key not in found}
+    if missing:
+        new_tags = [Tag(name=name, slug=slugify(name)) for name in missing.values()]
+        Tag.objects.bulk_create([t for t in new_tags if t.slug], ignore_conflicts=True)
+        for tag in Tag.objects.annotate(lname=Lower('name')).filter(lname__in=missing):
+            found[tag.lname] = tag
+        unresolved = [name for key, name in missing.items() if key not in found]
+        if unresolved:
+            # never map a name onto a differently named tag that owns its slug
+            raise forms.ValidationError(tag_name_errors(unresolved))
+    return [found[key] for key in wanted]
+
 
 class UserUpdateForm(forms.ModelForm):
     email = forms.EmailField()
@@ -14,7 +74,7 @@ class UserUpdateForm(forms.ModelForm):
 class ProfileUpdateForm(forms.ModelForm):
     class Meta:
         model = Profile
-        fields = ['image']
+        fields = ['bio', 'profile_picture']
 
 class PostForm(forms.ModelForm):
     # allow user to add tags as comma-separated names
@@ -27,9 +87,6 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ['title', 'content', 'published']
-        widgets = {
-            'tags': TagWidget(),
-        }   
 
     def __init__(self, *args, **kwargs):
         # if editing an existing post, populate tags_field with existing tags
@@ -37,6 +94,14 @@ class PostForm(forms.ModelForm):
         if self.instance and self.instance.pk:
             self.fields['tags_field'].initial = ', '.join(t.name for t in self.instance.tags.all())
 
+    def clean_tags_field(self):
+        # comma-separated string in, list of names out
+        names = [t.strip() for t in self.cleaned_data['tags_field'].split(',') if t.strip()]
+        errors = tag_name_errors(names)
+        if errors:
+            raise forms.ValidationError(errors)
+        return names
+
     def save(self, commit=True, user=None):
         # save Post first, then handle tags
         post = super().save(commit=False)
@@ -44,16 +109,7 @@ class PostForm(forms.ModelForm):
             post.author = user
         if commit:
             post.save()
-        # handle tags string
-        tag_names = [t.strip() for t in (self.cleaned_data.get('tags_field') or '').split(',') if t.strip()]
-        tags = []
-        for name in tag_names:
-            tag_obj, created = Tag.objects.get_or_create(name__iexact=name, defaults={'name': name})
-            # get_or_create with case-insensitive: fallback since get_or_create doesn't support case-insensitive directly
-            if created is False and tag_obj.name.lower() != name.lower():
-                # ensure canonical capitalization if needed
-                pass
-            tags.append(tag_obj)
+        tags = resolve_tags(self.cleaned_data.get('tags_field') or [])
         # assign tags
         if commit:
             post.tags.set(tags)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from blog import cards
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the post card fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them.')
+
+    def handle(self, *args, **options):
+        stats = cards.stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.1%}"
+        )
+        if options['reset']:
+            cards.reset_stats()
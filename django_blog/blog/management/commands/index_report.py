@@ -0,0 +1,135 @@
+import re
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from blog import facets, views
+from blog.models import Post, Tag
+from blog.pagination import encode_cursor
+
+# sqlite: "SCAN blog_post" is a full table scan, "SCAN blog_post USING INDEX x"
+# walks an index; postgres: "Seq Scan on blog_post"
+FULL_SCAN_RE = re.compile(r'^SCAN (?!.*\b(USING|VIRTUAL TABLE|CONSTANT ROW)\b)|Seq Scan on')
+TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE FOR ORDER BY|Sort Method')
+
+# full scans that are the known price of a feature, not a regression:
+# (scenario label, pattern the query matches, why it is accepted)
+EXPECTED_SCANS = [
+    ('home feed, numbered page', re.compile(r'^SELECT COUNT\(\*\)'),
+     'the ?page=N fallback counts the posts; the feed itself pages by cursor'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the blog views against the current database, EXPLAIN every query '
+        'they issue and flag full table scans and unindexed sorts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help='Exit with an error if any unexpected full scan is found (for CI).')
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Print the plan of every query, not only the flagged ones.')
+
+    def scenarios(self):
+        """(label, view, url) for the requests the blog actually serves."""
+        post = Post.objects.order_by('-date_posted', '-id').first()
+        tag = Tag.objects.first()
+        found = [
+            ('home feed', views.PostListView.as_view(), reverse('blog-home')),
+            ('home feed, numbered page', views.PostListView.as_view(), reverse('blog-home') + '?page=1'),
+            ('search', views.post_search, reverse('post-search') + '?q=django'),
+        ]
+        if post is not None:
+            cursor = encode_cursor(post, 'next')
+            found += [
+                ('home feed, next page', views.PostListView.as_view(), f"{reverse('blog-home')}?cursor={cursor}"),
+                ('author facet', views.PostListView.as_view(),
+                 f"{reverse('blog-home')}?author={post.author.username}"),
+                ('post detail', views.PostDetailView.as_view(), reverse('post-detail', args=[post.pk])),
+                ('comments, first page', views.comment_list, reverse('comment-list', args=[post.pk])),
+            ]
+            comment = post.comments.order_by('date_posted', 'id').first()
+            if comment is not None:
+                found.append((
+                    'comments, load more', views.comment_list,
+                    f"{reverse('comment-list', args=[post.pk])}?cursor={encode_cursor(comment, 'next')}",
+                ))
+        if tag is not None:
+            found += [
+                ('tag feed', views.TagPostListView.as_view(), reverse('tagged-posts', args=[tag.slug])),
+                ('tag facet', views.PostListView.as_view(), f"{reverse('blog-home')}?tag={tag.name}"),
+            ]
+        return found
+
+    def capture(self, view, url):
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        kwargs = resolve(request.path_info).kwargs
+        with CaptureQueriesContext(connection) as ctx:
+            try:
+                response = view(request, **kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+            except Exception as exc:  # a missing template etc. must not stop the report
+                self.stderr.write(f'  ({type(exc).__name__}: {exc})')
+        return [q['sql'] for q in ctx.captured_queries]
+
+    def explain(self, sql):
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            rows = cursor.fetchall()
+        if connection.vendor == 'sqlite':
+            return [row[-1] for row in rows]
+        return [' '.join(str(col) for col in row) for row in rows]
+
+    def expected_scan(self, label, sql):
+        """Why a full scan of `sql` is accepted in scenario `label`, or None."""
+        for expected_label, pattern, reason in EXPECTED_SCANS:
+            if label == expected_label and pattern.search(sql.lstrip()):
+                return reason
+        return None
+
+    def handle(self, *args, **options):
+        # the facet index is loaded once per process with a deliberate scan
+        facets.index.ensure_fresh()
+
+        seen, scans, expected, sorts = set(), 0, 0, 0
+        for label, view, url in self.scenarios():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label}: GET {url}'))
+            for sql in self.capture(view, url):
+                if not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+                    continue
+                seen.add(sql)
+                plan = self.explain(sql)
+                full = [line for line in plan if FULL_SCAN_RE.search(line.strip())]
+                sort = [line for line in plan if TEMP_SORT_RE.search(line)]
+                reason = self.expected_scan(label, sql) if full else None
+                scans += bool(full) and reason is None
+                expected += reason is not None
+                sorts += bool(sort)
+                if full or sort or options['verbose_plans']:
+                    self.stdout.write(f'  {sql[:200]}')
+                    if reason is not None:
+                        self.stdout.write(self.style.NOTICE(f'    (expected: {reason})'))
+                    for line in plan:
+                        style = self.style.ERROR if line in full else (
+                            self.style.WARNING if line in sort else str)
+                        self.stdout.write(style(f'    {line}'))
+
+        summary = (
+            f'{len(seen)} queries checked, {scans} with unexpected full scans '
+            f'({expected} expected), {sorts} with unindexed sorts.'
+        )
+        if scans:
+            if options['fail_on_scan']:
+                raise CommandError(summary)
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
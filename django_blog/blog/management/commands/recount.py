@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = 'Recompute Post.comment_count and Tag.post_count from the source tables.'
+
+    def handle(self, *args, **options):
+        posts, tags = recount_all()
+        self.stdout.write(self.style.SUCCESS(f'Recounted {posts} posts and {tags} tags.'))
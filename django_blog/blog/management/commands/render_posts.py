@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Backfill the pre-rendered content_html, excerpt and reading_time of every post.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch, count = [], 0
+        posts = Post.objects.only('pk', 'content').iterator(chunk_size=batch_size)
+        for post in posts:
+            post.render_content()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                count += self._flush(batch)
+                batch = []
+        if batch:
+            count += self._flush(batch)
+        self.stdout.write(self.style.SUCCESS(f'Rendered {count} posts.'))
+
+    def _flush(self, batch):
+        Post.objects.bulk_update(batch, ['content_html', 'excerpt', 'reading_time'])
+        return len(batch)
@@ -0,0 +1,117 @@
+"""
+Full-page cache for anonymous traffic on the blog feeds.
+
+Only the URL names listed in settings.BLOG_PAGE_CACHE['URL_NAMES'] are cached,
+only for anonymous GET/HEAD requests, keyed on the path plus the sorted query
+string. Entries stay fresh for TIMEOUT seconds and may then be served stale
+for STALE_TIMEOUT more seconds while a single request (holding a short cache
+lock) regenerates the page. Saving or deleting a post purges every page by
+bumping a generation counter that is part of the key.
+"""
+import hashlib
+import time
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+GENERATION_KEY = 'blog:page:generation'
+
+DEFAULTS = {
+    'URL_NAMES': ['blog-home'],
+    'TIMEOUT': 60,
+    'STALE_TIMEOUT': 300,
+    'LOCK_TIMEOUT': 30,
+    'IGNORED_PARAMS': ['utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content'],
+}
+
+
+def page_cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_PAGE_CACHE', {})}
+
+
+def purge():
+    """Invalidate every cached page at once."""
+    cache.add(GENERATION_KEY, 0, timeout=None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+def normalize_query(query_string, ignored=()):
+    params = [(k, v) for k, v in parse_qsl(query_string) if v and k not in ignored]
+    return urlencode(sorted(params))
+
+
+def page_key(request, conf):
+    generation = cache.get(GENERATION_KEY, 0)
+    raw = f"{request.path}?{normalize_query(request.META.get('QUERY_STRING', ''), conf['IGNORED_PARAMS'])}"
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'blog:page:{generation}:{digest}'
+
+
+class AnonymousPageCacheMiddleware:
+    """Must come after AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        key = getattr(request, '_page_cache_key', None)
+        if key is not None:
+            self._store(request, response, key)
+        return response
+
+    def _cacheable(self, request, conf):
+        return (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match is not None
+            and request.resolver_match.url_name in conf['URL_NAMES']
+            and not request.user.is_authenticated
+            # pending flash messages are per-visitor
+            and 'messages' not in request.COOKIES
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        conf = page_cache_settings()
+        if not self._cacheable(request, conf):
+            return None
+        key = page_key(request, conf)
+        entry = cache.get(key)
+        if entry is not None:
+            fresh_until, status, content_type, content = entry
+            if time.time() < fresh_until:
+                return self._response(status, content_type, content, 'HIT')
+            if not cache.add(f'{key}:lock', 1, timeout=conf['LOCK_TIMEOUT']):
+                # someone else is regenerating it
+                return self._response(status, content_type, content, 'STALE')
+        request._page_cache_key = key
+        return None
+
+    def _store(self, request, response, key):
+        conf = page_cache_settings()
+        try:
+            if (
+                response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not response.has_header('Set-Cookie')
+            ):
+                entry = (
+                    time.time() + conf['TIMEOUT'],
+                    response.status_code,
+                    response.get('Content-Type'),
+                    response.content,
+                )
+                cache.set(key, entry, timeout=conf['TIMEOUT'] + conf['STALE_TIMEOUT'])
+                response['X-Page-Cache'] = 'MISS'
+        finally:
+            cache.delete(f'{key}:lock')
+
+    def _response(self, status, content_type, content, state):
+        response = HttpResponse(content, status=status, content_type=content_type)
+        response['X-Page-Cache'] = state
+        return response
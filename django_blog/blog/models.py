@@ -1,8 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
-from django.utils.text import slugify
-from taggit.managers import TaggableManager
+from django.utils.html import linebreaks
+from django.utils.text import slugify, Truncator
+
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
 
 class Post(models.Model):
     title = models.CharField(max_length=100)
@@ -10,15 +14,45 @@ class Post(models.Model):
     date_posted = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     updated_at = models.DateTimeField(auto_now=True)
+    published = models.BooleanField(default=True)
+    # denormalized, maintained by blog/signals.py (repair with `manage.py recount`)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # rendered from `content` on save (backfill with `manage.py render_posts`)
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False)
 
     class Meta:
         ordering = ['-date_posted']
-    
-    tags = TaggableManager(blank=True)
+        indexes = [
+            # feed order and keyset seeks on (date_posted, id)
+            models.Index(fields=['-date_posted', '-id'], name='blog_post_feed_idx'),
+            # per-author feed
+            models.Index(fields=['author', '-date_posted', '-id'], name='blog_post_author_feed_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def render_content(self):
+        # same output as the |linebreaks and |truncatechars:200 template filters
+        self.content_html = linebreaks(self.content, autoescape=True)
+        self.excerpt = Truncator(self.content).chars(EXCERPT_LENGTH)
+        self.reading_time = max(1, round(len(self.content.split()) / WORDS_PER_MINUTE))
+
+    def save(self, *args, **kwargs):
+        self.render_content()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'content_html', 'excerpt', 'reading_time'}
+        elif update_fields is None and self.pk and not self._state.adding:
+            # never write back a stale comment_count, the signals own it
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'comment_count'
+            ]
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('post-detail', kwargs={'pk': self.pk})
     
@@ -32,12 +66,19 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['date_posted']
+        indexes = [
+            # a post's comments in order, and the "load more" seeks
+            models.Index(fields=['post', 'date_posted', 'id'], name='blog_comment_post_date_idx'),
+            # latest comment of a post, a validator for conditional GETs of the post page
+            models.Index(fields=['post', '-updated_at'], name='blog_comment_post_updated_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
 
 class Profile(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    # users.Profile owns the `profile` accessor
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='blog_profile')
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
 
@@ -48,6 +89,7 @@ class Tag(models.Model):
     name = models.CharField(max_length=30, unique=True)
     posts = models.ManyToManyField(Post, related_name='tags', blank=True)
     slug = models.SlugField(max_length=30, unique=True, blank=True)
+    post_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['name']
@@ -58,4 +100,10 @@ class Tag(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if kwargs.get('update_fields') is None and self.pk and not self._state.adding:
+            # never write back a stale post_count, the signals own it
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'post_count'
+            ]
         super().save(*args, **kwargs)
\ No newline at end of file
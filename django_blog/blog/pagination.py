@@ -0,0 +1,113 @@
+"""
+Keyset (seek) pagination for the post feeds.
+
+Offset pagination needs a COUNT(*) and an OFFSET that grows with the page
+number. Here a page is fetched with a seek predicate on (date_posted, id)
+instead, so every page costs the same no matter how deep it is and no count
+query is issued. Cursors are opaque url-safe tokens.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(obj, direction):
+    raw = json.dumps([obj.date_posted.isoformat(), obj.pk, direction])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        date_posted, pk, direction = json.loads(base64.urlsafe_b64decode(padded))
+        date_posted = parse_datetime(date_posted)
+        if date_posted is None or direction not in ('next', 'prev'):
+            raise ValueError
+        return date_posted, int(pk), direction
+    except (ValueError, TypeError):
+        raise Http404('Invalid cursor.')
+
+
+class KeysetPage:
+    """Quacks enough like a Page for the templates; there is no page number."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _seek(queryset, date_posted, pk, backwards):
+    # rows strictly before (backwards) or after the (date_posted, id) key,
+    # nearest first; the redundant bound on date_posted lets the database
+    # start the index walk at the key instead of filtering from the top
+    if backwards:
+        return (
+            queryset.filter(date_posted__lte=date_posted)
+            .filter(Q(date_posted__lt=date_posted) | Q(id__lt=pk))
+            .order_by('-date_posted', '-id')
+        )
+    return (
+        queryset.filter(date_posted__gte=date_posted)
+        .filter(Q(date_posted__gt=date_posted) | Q(id__gt=pk))
+        .order_by('date_posted', 'id')
+    )
+
+
+def keyset_paginate(queryset, per_page, cursor=None, descending=True):
+    """
+    Return the KeysetPage after (or before) `cursor`. Rows are ordered by
+    (date_posted, id), newest first unless `descending` is False.
+    Works for any model with a `date_posted` column.
+    """
+    if cursor is None:
+        order = ('-date_posted', '-id') if descending else ('date_posted', 'id')
+        rows = list(queryset.order_by(*order)[:per_page + 1])
+        has_more, has_less = len(rows) > per_page, False
+        rows = rows[:per_page]
+    else:
+        date_posted, pk, direction = decode_cursor(cursor)
+        forward = direction == 'next'
+        rows = list(_seek(queryset, date_posted, pk, backwards=forward == descending)[:per_page + 1])
+        if forward:
+            has_more, has_less = len(rows) > per_page, True
+            rows = rows[:per_page]
+        else:
+            has_more, has_less = True, len(rows) > per_page
+            rows = rows[:per_page][::-1]
+
+    next_cursor = encode_cursor(rows[-1], 'next') if rows and has_more else None
+    previous_cursor = encode_cursor(rows[0], 'prev') if rows and has_less else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin: pages by cursor by default, while ?page=N still goes
+    through Django's regular (offset) Paginator.
+    """
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET or self.page_kwarg in self.kwargs:
+            return super().paginate_queryset(queryset, page_size)
+        page = keyset_paginate(queryset, page_size, self.request.GET.get(self.cursor_kwarg))
+        return (None, page, page.object_list, page.has_other_pages())
@@ -0,0 +1,174 @@
+"""
+Full-text search for blog posts.
+
+Posts are mirrored into an SQLite FTS5 table (``blog_post_fts``) whose rowid
+is the post id, so a search only touches the index and then loads the page of
+matching posts by primary key. The index is kept in sync by the receivers in
+``blog/signals.py`` and can be rebuilt with ``manage.py rebuild_search_index``.
+
+Only published posts are indexed, like the feeds only list published posts.
+On databases without FTS5 the helpers fall back to the old ``icontains`` scan.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Post
+
+FTS_TABLE = 'blog_post_fts'
+
+# column weights for bm25(): title, content, tags
+RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def ensure_index():
+    """Create the FTS table if it does not exist yet."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(title, content, tags, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+
+def _document(post):
+    tags = ' '.join(post.tags.values_list('name', flat=True))
+    return post.title, post.content, tags
+
+
+def index_post(post):
+    """Insert or replace the index row of a single post; drafts are only removed."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+        if not post.published:
+            return
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)",
+            [post.pk, *_document(post)],
+        )
+
+
+def index_posts(post_ids):
+    for post in Post.objects.filter(pk__in=list(post_ids)):
+        index_post(post)
+
+
+def remove_post(post_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+
+
+def rebuild_index(batch_size=1000):
+    """Drop every index row and re-index all published posts. Returns the number indexed."""
+    ensure_index()
+    if not fts_available():
+        return 0
+    count = 0
+    rows = []
+    posts = Post.objects.filter(published=True).prefetch_related('tags').iterator(chunk_size=batch_size)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        for post in posts:
+            tags = ' '.join(tag.name for tag in post.tags.all())
+            rows.append((post.pk, post.title, post.content, tags))
+            if len(rows) >= batch_size:
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)",
+                    rows,
+                )
+                count += len(rows)
+                rows = []
+        if rows:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+            count += len(rows)
+    return count
+
+
+def build_match_query(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+    Every word becomes a quoted term (so user input can't inject FTS syntax);
+    terms are AND-ed and the last one is a prefix match for search-as-you-type.
+    """
+    terms = _TOKEN_RE.findall(query or '')
+    if not terms:
+        return ''
+    quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+class SearchResults:
+    """
+    Lazy, sliceable result set so it can be handed straight to a Paginator.
+    count() and slicing only query the FTS table; slicing then loads the
+    matching posts with a single primary-key lookup, in rank order.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.match = build_match_query(query)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            if not self.match:
+                self._count = 0
+            elif fts_available():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                        [self.match],
+                    )
+                    self._count = cursor.fetchone()[0]
+            else:
+                self._count = self._fallback().count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        if not self.match or stop <= start:
+            return []
+        if not fts_available():
+            return list(self._fallback()[start:stop])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, %s, %s, %s) LIMIT %s OFFSET %s",
+                [self.match, *RANK_WEIGHTS, stop - start, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.select_related('author').order_by().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def _fallback(self):
+        return Post.objects.filter(published=True).filter(
+            Q(title__icontains=self.query) |
+            Q(content__icontains=self.query) |
+            Q(tags__name__icontains=self.query)
+        ).distinct()
+
+
+def search_posts(query):
+    return SearchResults(query)
@@ -0,0 +1,214 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Post, Comment, Tag
+from . import cards, counters, facets, search
+from .middleware import purge as purge_page_cache
+
+
+def tagged_post_ids(tag):
+    # straight from the m2m table, without joining the post table
+    return list(Tag.posts.through.objects.filter(tag=tag).values_list('post_id', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_posts(sender, instance, **kwargs):
+    # the delete cascades through the m2m table without m2m_changed
+    instance._tagged_post_ids = tagged_post_ids(instance)
+
+
+@receiver(m2m_changed, sender=Tag.posts.through)
+def remember_cleared_posts(sender, instance, action, **kwargs):
+    # tag.posts.clear(): remember which posts lose the tag
+    if action == 'pre_clear' and not isinstance(instance, Post):
+        instance._tagged_post_ids = tagged_post_ids(instance)
+
+
+# keep the full-text index in sync with posts and their tags
+
+@receiver(post_save, sender=Post)
+def index_post_on_save(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_index(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(m2m_changed, sender=Tag.posts.through)
+def reindex_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, Post):
+        search.index_post(instance)
+    elif action == 'post_clear':
+        search.index_posts(getattr(instance, '_tagged_post_ids', []))
+    else:
+        search.index_posts(pk_set or [])
+
+
+@receiver(post_save, sender=Tag)
+def reindex_on_tag_rename(sender, instance, created, **kwargs):
+    if not created:
+        search.index_posts(tagged_post_ids(instance))
+
+
+@receiver(post_delete, sender=Tag)
+def reindex_on_tag_delete(sender, instance, **kwargs):
+    search.index_posts(getattr(instance, '_tagged_post_ids', []))
+
+
+# denormalized counters, see blog/counters.py
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.bump_comment_count(instance.post_id, -1)
+
+
+@receiver(m2m_changed, sender=Tag.posts.through)
+def count_tagged_posts(sender, instance, action, pk_set, **kwargs):
+    # pk_set of an add only holds new links, but a remove passes every
+    # given pk: count only the through rows that really go away
+    through = Tag.posts.through.objects
+    if isinstance(instance, Post):
+        # post.tags.add/remove/clear: pk_set holds tag ids
+        if action == 'pre_clear':
+            instance._counted_tag_ids = list(through.filter(post=instance).values_list('tag_id', flat=True))
+        elif action == 'post_clear':
+            counters.bump_post_count(getattr(instance, '_counted_tag_ids', []), -1)
+        elif action == 'pre_remove':
+            instance._counted_tag_ids = list(
+                through.filter(post=instance, tag__in=pk_set or []).values_list('tag_id', flat=True)
+            )
+        elif action == 'post_remove':
+            counters.bump_post_count(getattr(instance, '_counted_tag_ids', []), -1)
+        elif action == 'post_add' and pk_set:
+            counters.bump_post_count(pk_set, 1)
+    elif action == 'post_clear':
+        Tag.objects.filter(pk=instance.pk).update(post_count=0)
+    elif action == 'pre_remove':
+        instance._removed_post_count = through.filter(tag=instance, post__in=pk_set or []).count()
+    elif action == 'post_remove':
+        counters.bump_post_count([instance.pk], -getattr(instance, '_removed_post_count', 0))
+    elif action == 'post_add' and pk_set:
+        counters.bump_post_count([instance.pk], len(pk_set))
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_deleted_post(sender, instance, **kwargs):
+    # the cascade removes the through rows without sending m2m_changed
+    counters.bump_post_count(instance.tags.values_list('pk', flat=True), -1)
+
+
+# post card fragment cache, see blog/cards.py
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_card_on_post_change(sender, instance, **kwargs):
+    cards.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_card_on_comment_change(sender, instance, **kwargs):
+    cards.invalidate(instance.post_id)
+
+
+@receiver(m2m_changed, sender=Tag.posts.through)
+def invalidate_card_on_tag_change(sender, instance, action, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, Post):
+        cards.invalidate(instance.pk)
+    elif action == 'post_clear':
+        cards.invalidate(*getattr(instance, '_tagged_post_ids', []))
+    else:
+        cards.invalidate(*(pk_set or []))
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_cards_on_tag_rename(sender, instance, created, **kwargs):
+    if not created:
+        cards.invalidate(*tagged_post_ids(instance))
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_cards_on_tag_delete(sender, instance, **kwargs):
+    cards.invalidate(*getattr(instance, '_tagged_post_ids', []))
+
+
+# anonymous full-page cache, see blog/middleware.py
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_page_cache_on_post_change(sender, **kwargs):
+    purge_page_cache()
+
+
+# in-memory facet bitmaps, see blog/facets.py (applied once the write commits)
+
+@receiver(pre_save, sender=Post)
+def remember_facet_state(sender, instance, update_fields=None, **kwargs):
+    # only a new post, a new author or (un)publishing changes the bitmaps;
+    # skip the version bump (and every other process's reload) for plain edits
+    if instance._state.adding:
+        instance._facets_changed = instance.published
+    elif update_fields is not None and not {'author', 'published'} & set(update_fields):
+        instance._facets_changed = False
+    else:
+        old = Post.objects.filter(pk=instance.pk).values_list('author_id', 'published').first()
+        instance._facets_changed = old != (instance.author_id, instance.published)
+
+
+@receiver(post_save, sender=Post)
+def add_post_to_facets(sender, instance, **kwargs):
+    if not getattr(instance, '_facets_changed', True):
+        return
+    post_id, author_id = instance.pk, instance.author_id
+    if instance.published:
+        transaction.on_commit(lambda: facets.index.add_post(post_id, author_id))
+    else:
+        # drafts are not in the index
+        transaction.on_commit(lambda: facets.index.hide_post(post_id))
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_facets(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: facets.index.remove_post(post_id))
+
+
+@receiver(m2m_changed, sender=Tag.posts.through)
+def update_tag_facets(sender, instance, action, pk_set, **kwargs):
+    ids = list(pk_set or [])
+    if isinstance(instance, Post):
+        post_id = instance.pk
+        if action == 'post_add':
+            transaction.on_commit(lambda: facets.index.set_post_tags(post_id, added=ids))
+        elif action == 'post_remove':
+            transaction.on_commit(lambda: facets.index.set_post_tags(post_id, removed=ids))
+        elif action == 'post_clear':
+            transaction.on_commit(lambda: facets.index.clear_post_tags(post_id))
+    else:
+        tag_id = instance.pk
+        if action == 'post_add':
+            transaction.on_commit(lambda: facets.index.tag_posts(tag_id, ids))
+        elif action == 'post_remove':
+            transaction.on_commit(lambda: facets.index.untag_posts(tag_id, ids))
+        elif action == 'post_clear':
+            cleared = getattr(instance, '_tagged_post_ids', [])
+            transaction.on_commit(lambda: facets.index.untag_posts(tag_id, cleared))
+
+
+@receiver(post_delete, sender=Tag)
+def remove_tag_from_facets(sender, instance, **kwargs):
+    tag_id = instance.pk
+    transaction.on_commit(lambda: facets.index.remove_tag(tag_id))
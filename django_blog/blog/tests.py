@@ -1,3 +1,420 @@
+import io
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from . import cards, facets, search
+from .forms import PostForm, resolve_tags
+from .pagination import _seek, keyset_paginate
+from .models import Comment, Post, Tag
+
+
+class BlogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+
+    def make_post(self, title='Post', content='Some content', author=None, tags=()):
+        post = Post.objects.create(title=title, content=content, author=author or self.user)
+        if tags:
+            post.tags.add(*tags)
+        return post
+
+
+class CounterTests(BlogTestCase):
+    def test_tag_save_keeps_the_counted_value(self):
+        tag = Tag.objects.create(name='django')
+        stale = Tag.objects.get(pk=tag.pk)
+        self.make_post(tags=[tag])
+        stale.name = 'Django'
+        stale.save()
+        tag.refresh_from_db()
+        self.assertEqual((tag.name, tag.post_count), ('Django', 1))
+
+    def test_removing_a_tag_twice_or_an_unrelated_tag_counts_once(self):
+        tag, other = Tag.objects.create(name='django'), Tag.objects.create(name='python')
+        post = self.make_post(tags=[tag])
+        post.tags.remove(tag)
+        post.tags.remove(tag, other)
+        tag.posts.remove(post)
+        tag.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((tag.post_count, other.post_count), (0, 0))
+
+    def test_tag_side_add_and_remove(self):
+        tag = Tag.objects.create(name='django')
+        posts = [self.make_post(title=f'Post {i}') for i in range(3)]
+        tag.posts.add(*posts)
+        tag.posts.remove(posts[0], posts[0])
+        tag.refresh_from_db()
+        self.assertEqual(tag.post_count, 2)
+        posts[1].delete()
+        tag.refresh_from_db()
+        self.assertEqual(tag.post_count, 1)
+
+    def test_comment_count_follows_comments_and_never_goes_negative(self):
+        post = self.make_post()
+        comments = [Comment.objects.create(post=post, author=self.user, content=f'c{i}') for i in range(2)]
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
+        Post.objects.filter(pk=post.pk).update(comment_count=0)  # drifted
+        comments[0].delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+    def test_recount_repairs_drift(self):
+        tag = Tag.objects.create(name='django')
+        post = self.make_post(tags=[tag])
+        Comment.objects.create(post=post, author=self.user, content='c')
+        Post.objects.update(comment_count=7)
+        Tag.objects.update(post_count=7)
+        call_command('recount', stdout=io.StringIO())
+        post.refresh_from_db()
+        tag.refresh_from_db()
+        self.assertEqual((post.comment_count, tag.post_count), (1, 1))
+
+
+class SearchTests(BlogTestCase):
+    def titles(self, query):
+        return [post.title for post in search.search_posts(query)[:10]]
+
+    def test_title_matches_rank_above_content_matches(self):
+        self.make_post(title='Notes', content='a long text about caching and more')
+        self.make_post(title='Caching', content='a long text about other things')
+        self.assertEqual(self.titles('caching'), ['Caching', 'Notes'])
+        self.assertEqual(search.search_posts('caching').count(), 2)
+
+    def test_query_is_quoted_and_last_term_is_a_prefix(self):
+        self.assertEqual(search.build_match_query('cach "OR" x'), '"cach" "OR" "x"*')
+        self.make_post(title='Caching')
+        self.assertEqual(self.titles('cach'), ['Caching'])
+
+    def test_drafts_are_not_found(self):
+        post = self.make_post(title='Caching')
+        Post.objects.create(title='Caching draft', content='x', author=self.user, published=False)
+        self.assertEqual(self.titles('caching'), ['Caching'])
+        self.assertEqual(search.search_posts('caching').count(), 1)
+        post.published = False
+        post.save()
+        self.assertEqual(search.search_posts('caching').count(), 0)
+        self.assertEqual(search.rebuild_index(), 0)
+        post.published = True
+        post.save()
+        self.assertEqual(self.titles('caching'), ['Caching'])
+
+    def test_tag_rename_reindexes_its_posts(self):
+        tag = Tag.objects.create(name='orm')
+        self.make_post(title='Queries', tags=[tag])
+        self.assertEqual(self.titles('orm'), ['Queries'])
+        tag.name = 'database'
+        tag.save()
+        self.assertEqual(self.titles('orm'), [])
+        self.assertEqual(self.titles('database'), ['Queries'])
+
+    def test_tag_clear_and_delete_reindex_their_posts(self):
+        cleared, deleted = Tag.objects.create(name='orm'), Tag.objects.create(name='sql')
+        self.make_post(title='Queries', tags=[cleared, deleted])
+        cleared.posts.clear()
+        deleted.delete()
+        self.assertEqual(self.titles('orm'), [])
+        self.assertEqual(self.titles('sql'), [])
+        self.assertEqual(self.titles('queries'), ['Queries'])
+
+
+class KeysetPaginationTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.posts = [self.make_post(title=f'Post {i}') for i in range(25)]
+
+    def feed(self, **params):
+        response = self.client.get(reverse('post-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_next_and_previous_walk_the_feed(self):
+        newest_first = [post.pk for post in reversed(self.posts)]
+        first = self.feed()
+        self.assertEqual([post.pk for post in first], newest_first[:10])
+        self.assertFalse(first.has_previous())
+
+        second = self.feed(cursor=first.next_cursor)
+        third = self.feed(cursor=second.next_cursor)
+        self.assertEqual([post.pk for post in second], newest_first[10:20])
+        self.assertEqual([post.pk for post in third], newest_first[20:])
+        self.assertFalse(third.has_next())
+
+        back = self.feed(cursor=third.previous_cursor)
+        self.assertEqual([post.pk for post in back], newest_first[10:20])
+        self.assertEqual(
+            [post.pk for post in self.feed(cursor=back.previous_cursor)], newest_first[:10]
+        )
+
+    def test_ties_on_date_posted_are_broken_by_id(self):
+        Post.objects.update(date_posted=self.posts[0].date_posted)
+        seen = []
+        page = keyset_paginate(Post.objects.all(), 10)
+        while True:
+            seen += [post.pk for post in page]
+            if not page.has_next():
+                break
+            page = keyset_paginate(Post.objects.all(), 10, page.next_cursor)
+        self.assertEqual(seen, sorted((post.pk for post in self.posts), reverse=True))
+
+    def test_seek_starts_the_index_walk_at_the_cursor(self):
+        post = self.posts[10]
+        plan = _seek(Post.objects.all(), post.date_posted, post.pk, backwards=True)[:10].explain()
+        self.assertIn('blog_post_feed_idx (date_posted<?)', plan)
+
+    def test_page_number_still_uses_offset_pagination(self):
+        page = self.feed(page=2)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 10)
+
+    def test_invalid_cursor_is_a_404(self):
+        response = self.client.get(reverse('post-list'), {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
+
+
+class CardCacheTests(BlogTestCase):
+    def render(self, *posts):
+        # fresh rows, as the list view would load them
+        return dict(cards.render_cards(Post.objects.filter(pk__in=[p.pk for p in posts]).order_by('pk')))
+
+    def test_second_render_is_served_from_the_cache(self):
+        posts = [self.make_post(title=f'Post {i}') for i in range(3)]
+        self.render(*posts)
+        self.render(*posts)
+        self.assertEqual(cards.stats(), {'hits': 3, 'misses': 3, 'hit_rate': 0.5})
+
+    def test_comment_invalidates_only_its_posts_card(self):
+        post, other = self.make_post(title='First'), self.make_post(title='Second')
+        self.render(post, other)
+        Comment.objects.create(post=post, author=self.user, content='Nice')
+        self.assertIsNone(cache.get(cards.card_key(post.pk)))
+        self.assertIsNotNone(cache.get(cards.card_key(other.pk)))
+        self.assertIn('1 comment', self.render(post, other)[post])
+
+    def test_tag_rename_and_delete_invalidate_tagged_cards(self):
+        tag = Tag.objects.create(name='orm')
+        post = self.make_post(tags=[tag])
+        self.render(post)
+        tag.name = 'database'
+        tag.save()
+        self.assertIsNone(cache.get(cards.card_key(post.pk)))
+        self.assertIn('database', self.render(post)[post])
+        tag.delete()
+        self.assertIsNone(cache.get(cards.card_key(post.pk)))
+        self.assertNotIn('database', self.render(post)[post])
+
+
+class FacetTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        self.django, self.python, self.sql = (Tag.objects.create(name=n) for n in ('django', 'python', 'sql'))
+        self.both = self.make_post(title='Both', tags=[self.django, self.python])
+        self.django_only = self.make_post(title='Django only', tags=[self.django])
+        self.sql_by_bob = self.make_post(title='SQL', author=self.bob, tags=[self.sql])
+        facets.index.load()
+
+    def titles(self, query):
+        response = self.client.get(reverse('post-list') + '?' + query)
+        self.assertEqual(response.status_code, 200)
+        return [post.title for post in response.context['posts']]
+
+    def test_tag_filters_are_and_any_tag_filters_are_or(self):
+        self.assertEqual(self.titles('tag=django&tag=python'), ['Both'])
+        self.assertEqual(self.titles('any_tag=python&any_tag=sql'), ['SQL', 'Both'])
+        self.assertEqual(self.titles('tag=django&any_tag=python&any_tag=sql'), ['Both'])
+        self.assertEqual(self.titles('tag=django&tag=unknown'), [])
+
+    def test_author_filter_and_facet_counts(self):
+        self.assertEqual(self.titles('author=BOB'), ['SQL'])
+        response = self.client.get(reverse('post-list'), {'tag': 'django'})
+        self.assertEqual(
+            [(tag.name, n) for tag, n in response.context['tag_counts']], [('django', 2), ('python', 1)]
+        )
+        self.assertEqual([(user.username, n) for user, n in response.context['author_counts']], [('alice', 2)])
+
+    def test_writes_update_the_index_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sql_by_bob.tags.add(self.django)
+            self.both.tags.remove(self.python)
+            self.django_only.delete()
+        self.assertEqual(self.titles('tag=django'), ['SQL', 'Both'])
+        self.assertEqual(self.titles('tag=python'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.django.posts.clear()
+        self.assertEqual(self.titles('tag=django'), [])
+
+    def test_drafts_are_not_counted_or_paged(self):
+        secret = Tag.objects.create(name='secret')
+        with self.captureOnCommitCallbacks(execute=True):
+            visible = self.make_post(title='Visible', tags=[secret])
+            for i in range(12):
+                draft = Post.objects.create(title=f'Draft {i}', content='x', author=self.user, published=False)
+                draft.tags.add(secret)
+        response = self.client.get(reverse('post-list'), {'tag': 'secret'})
+        self.assertEqual([post.title for post in response.context['posts']], ['Visible'])
+        self.assertFalse(response.context['page_obj'].has_next())
+        self.assertEqual(response.context['facet_total'], 1)
+        self.assertIn((secret, 1), response.context['tag_counts'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            visible.published = False
+            visible.save()
+        self.assertEqual(self.titles('tag=secret'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.published = True
+            draft.save()
+        self.assertEqual(self.titles('tag=secret'), ['Draft 11'])
+        facets.index.load()
+        self.assertEqual(self.titles('tag=secret'), ['Draft 11'])
+
+    def test_plain_edits_do_not_bump_the_version(self):
+        version = cache.get(facets.VERSION_KEY, 0)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.both.title = 'Renamed'
+            self.both.save()
+        self.assertEqual((callbacks, cache.get(facets.VERSION_KEY, 0)), ([], version))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.both.author = self.bob
+            self.both.save()
+        self.assertEqual(cache.get(facets.VERSION_KEY, 0), version + 1)
+        self.assertEqual(self.titles('author=bob'), ['SQL', 'Renamed'])
+
+
+class PostDetailConditionalGetTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = self.make_post(title='Cached')
+        self.url = reverse('post-detail', args=[self.post.pk])
+
+    def revalidate(self, response, **extra):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'], **extra)
+
+    def test_unchanged_etag_is_a_304_without_rendering(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(response).status_code, 304)
+
+    def test_if_modified_since_alone_never_serves_a_stale_page(self):
+        Comment.objects.create(post=self.post, author=self.user, content='Gone soon').delete()
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        since = http_date(time.time() + 60)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+    def test_edits_and_comments_change_the_etag(self):
+        response = self.client.get(self.url)
+        comment = Comment.objects.create(post=self.post, author=self.user, content='First')
+        response = self.revalidate(response)
+        self.assertEqual(response.status_code, 200)
+        comment.delete()
+        response = self.revalidate(response)
+        self.assertEqual(response.status_code, 200)
+        self.post.title = 'Edited'
+        self.post.save()
+        self.assertEqual(self.revalidate(response).status_code, 200)
+
+    def test_etag_depends_on_the_viewer(self):
+        response = self.client.get(self.url)
+        self.client.force_login(self.user)
+        self.assertEqual(self.revalidate(response).status_code, 200)
+
+
+class RenderedContentTests(BlogTestCase):
+    def test_save_renders_html_excerpt_and_reading_time(self):
+        post = self.make_post(content='<b>Hi</b>\n\n' + 'word ' * 600)
+        self.assertTrue(post.content_html.startswith('<p>&lt;b&gt;Hi&lt;/b&gt;</p>'))
+        self.assertEqual(len(post.excerpt), 200)
+        self.assertEqual(post.reading_time, 3)
+        post.content = 'Short'
+        post.save(update_fields=['content'])
+        post.refresh_from_db()
+        self.assertEqual((post.content_html, post.excerpt, post.reading_time), ('<p>Short</p>', 'Short', 1))
+
+    def test_render_posts_backfills_stale_rows(self):
+        post = self.make_post(content='Fresh')
+        Post.objects.filter(pk=post.pk).update(content_html='', excerpt='')
+        call_command('render_posts', stdout=io.StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.content_html, post.excerpt), ('<p>Fresh</p>', 'Fresh'))
+
+
+class CommentPagingTests(BlogTestCase):
+    def test_detail_shows_the_first_page_and_load_more_fetches_the_rest(self):
+        post = self.make_post()
+        comments = [Comment.objects.create(post=post, author=self.user, content=f'c{i}') for i in range(25)]
+        response = self.client.get(reverse('post-detail', args=[post.pk]))
+        self.assertEqual(list(response.context['comments']), comments[:20])
+        cursor = response.context['comments_page'].next_cursor
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('comment-list', args=[post.pk]), {'cursor': cursor})
+        self.assertEqual(list(response.context['comments']), comments[20:])
+        self.assertNotContains(response, 'Load more comments')
+
+
+class PageCacheTests(BlogTestCase):
+    def test_anonymous_home_is_cached_until_a_post_changes(self):
+        self.make_post(title='First')
+        url = reverse('blog-home')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url, {'utm_source': 'feed'})['X-Page-Cache'], 'HIT')
+        self.make_post(title='Second')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Second')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.force_login(self.user)
+        self.assertFalse(self.client.get(reverse('blog-home')).has_header('X-Page-Cache'))
+
+
+class ResolveTagsTests(BlogTestCase):
+    def test_resolves_case_insensitively_in_constant_queries(self):
+        existing = Tag.objects.create(name='Django')
+        with self.assertNumQueries(3):
+            tags = resolve_tags(['django', 'Python', 'PYTHON', 'web', 'more'])
+        self.assertEqual([tag.name for tag in tags], ['Django', 'Python', 'web', 'more'])
+        self.assertEqual(tags[0], existing)
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_tags(['python', 'WEB']), tags[1:3])
+
+    def test_a_name_with_a_taken_slug_is_rejected(self):
+        Tag.objects.create(name='C++')
+        with self.assertRaises(ValidationError):
+            resolve_tags(['c#'])
+        self.assertEqual(list(Tag.objects.values_list('name', flat=True)), ['C++'])
+
+    def test_post_form_rejects_names_without_a_tag_of_their_own(self):
+        Tag.objects.create(name='C++')
+        for tags in ('python, c#', '日本語', 'c#, C++', 'web dev, web-dev'):
+            form = PostForm(data={'title': 'Tagged', 'content': 'Text', 'published': True, 'tags_field': tags})
+            self.assertFalse(form.is_valid(), tags)
+            self.assertIn('tags_field', form.errors)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_post_form_sets_the_tags(self):
+        form = PostForm(data={'title': 'Tagged', 'content': 'Text', 'published': True, 'tags_field': 'a, B, b'})
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(user=self.user)
+        self.assertEqual(sorted(post.tags.values_list('name', flat=True)), ['B', 'a'])
+
+
 
-# Create your tests here.
+class IndexReportTests(BlogTestCase):
+    def test_fail_on_scan_ignores_the_expected_scans(self):
+        post = self.make_post(tags=[Tag.objects.create(name='django')])
+        Comment.objects.create(post=post, author=self.user, content='Hi')
+        out = io.StringIO()
+        call_command('index_report', '--fail-on-scan', stdout=out, stderr=io.StringIO())
+        self.assertIn('0 with unexpected full scans (1 expected)', out.getvalue())
+        self.assertIn('(expected: the ?page=N fallback counts the posts', out.getvalue())
@@ -14,24 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path, include
-from django.contrib.auth import views as auth_views
-from users import views as user_views
-from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import path
 from . import views
 
+# admin, account and static routes live in django_blog/urls.py
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('register/', user_views.register, name='register'),
-    path('login/', auth_views.LoginView.as_view(template_name='users/login.html'), name='login'),
-    path('logout/', auth_views.LogoutView.as_view(template_name='users/logout.html'), name='logout'),
-    path('profile/', user_views.profile, name='profile'),
-    
-    path('posts/', include('blog.urls')),  # Include blog app URLs
+    path('posts/', views.PostListView.as_view(), name='post-list'),
     path('', views.PostListView.as_view(), name='blog-home'),  # Home page showing list of posts
+    path('search/', views.post_search, name='post-search'),
     path('post/<int:pk>/', views.PostDetailView.as_view(), name='post-detail'),
     path('post/new/', views.PostCreateView.as_view(), name='post-create'),
     path('post/<int:pk>/update/', views.PostUpdateView.as_view(), name='post-update'),
@@ -39,12 +29,8 @@ urlpatterns = [
 
     #comment URLs
     path('post/<int:pk>/comment/', views.add_comment, name='add-comment'),
-    path('comment/<int:pk>/delete/', views.delete_comment, name='delete-comment'),
-    path('comement/<int:pk>/update/', views.update_comment, name='update-comment'),
-    path('tags/<slug:tag_slug>/', views.TaggedPostListView.as_view(), name='tagged-posts'),
-    path('users/<str:username>/', views.UserPostListView.as_view(), name='user-posts'), 
+    path('post/<int:pk>/comments/', views.comment_list, name='comment-list'),
+    path('comment/<int:pk>/delete/', views.CommentDeleteView.as_view(), name='comment-delete'),
+    path('comment/<int:pk>/update/', views.CommentUpdateView.as_view(), name='comment-update'),
+    path('tags/<slug:tag_slug>/', views.TagPostListView.as_view(), name='tagged-posts'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
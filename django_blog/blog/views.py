@@ -8,20 +8,33 @@ from django.urls import reverse_lazy, reverse
 from django.contrib import messages 
 from .models import Post, Comment, Tag 
 from .forms import PostForm, CommentForm 
-from django.db.models import Q
+from django.core.paginator import Paginator
+from .search import search_posts
+from .pagination import KeysetPage, KeysetPaginationMixin, keyset_paginate
+from .cards import render_cards
+from . import facets
+from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+from django.http import Http404
+from django.db.models import OuterRef, Subquery
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from urllib.parse import urlencode
+
+COMMENTS_PER_PAGE = 20
 
 @login_required
 def profile(request):   
     if request.method == 'POST':
         u_form = UserUpdateForm(request.POST, instance=request.user)
-        p_form = ProfileUpdateForm(request.POST, request.FILES, instance=request.user.profile)
+        p_form = ProfileUpdateForm(request.POST, request.FILES, instance=request.user.blog_profile)
         if u_form.is_valid() and p_form.is_valid():
             u_form.save()
             p_form.save()
             return redirect('profile')
     else:
         u_form = UserUpdateForm(instance=request.user)
-        p_form = ProfileUpdateForm(instance=request.user.profile)
+        p_form = ProfileUpdateForm(instance=request.user.blog_profile)
 
     context = {
         'u_form': u_form,
@@ -30,49 +43,178 @@ def profile(request):
 
     return render(request, 'users/profile.html', context)
 
-class PostListView(ListView):
+class PostCardsMixin:
+    # list pages are assembled from cached post cards, see blog/cards.py
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cards'] = render_cards(context['object_list'])
+        return context
+
+class PostListView(PostCardsMixin, KeysetPaginationMixin, ListView):
     model = Post
-    template_name = 'blog/home.html'
+    template_name = 'blog/post_list.html'
     context_object_name = 'posts'
     ordering = ['-date_posted']
     paginate_by = 10
-    queryset = Post.objects.filter(published_date=True)
-
-def get_queryset(self):
-        return Post.objects.filter(published_date=True).order_by('-date_posted')
-        if self.request.GET.get('tag'):
-            tag_name = self.request.GET.get('tag')
-            self.queryset = self.queryset.filter(tags__name__iexact=tag_name)
-        if self.request.GET.get('author'):
-            author_username = self.request.GET.get('author')
-            self.queryset = self.queryset.filter(author__username__iexact=author_username) 
-        return self.queryset
+    queryset = Post.objects.filter(published=True)
+    facet_count_limit = 20
+
+    # ?tag=a&tag=b (all of), ?any_tag=a&any_tag=b (one of), ?author=x (one of)
+    # are answered from the in-memory bitmap index in blog/facets.py
 
+    def get_facet_filters(self):
+        if not hasattr(self, '_facet_filters'):
+            get = self.request.GET
+            self._facet_filters = {
+                'tag': [v for v in get.getlist('tag') if v],
+                'any_tag': [v for v in get.getlist('any_tag') if v],
+                'author': [v for v in get.getlist('author') if v],
+            }
+        return self._facet_filters
+
+    def paginate_queryset(self, queryset, page_size):
+        filters = self.get_facet_filters()
+        if not any(filters.values()):
+            return super().paginate_queryset(queryset, page_size)
+
+        names = {name.lower() for name in filters['tag'] + filters['any_tag']}
+        tag_ids = dict(
+            Tag.objects.annotate(lname=Lower('name')).filter(lname__in=names).values_list('lname', 'pk')
+        )
+        author_ids = list(
+            User.objects.annotate(lname=Lower('username'))
+            .filter(lname__in=[a.lower() for a in filters['author']]).values_list('pk', flat=True)
+        )
+        self.facet_result = facets.index.filter(
+            # an unknown tag in an AND filter must match nothing
+            all_tags=[tag_ids.get(name.lower(), -1) for name in filters['tag']],
+            any_tags=[tag_ids.get(name.lower(), -1) for name in filters['any_tag']],
+            authors=author_ids or ([-1] if filters['author'] else []),
+        )
+
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        after = before = None
+        if cursor:
+            try:
+                direction, post_id = cursor[0], int(cursor[1:])
+            except (ValueError, IndexError):
+                raise Http404('Invalid cursor.')
+            if direction == 'n':
+                after = post_id
+            elif direction == 'p':
+                before = post_id
+            else:
+                raise Http404('Invalid cursor.')
+        ids, has_older, has_newer = facets.page(self.facet_result, page_size, after=after, before=before)
+        posts = queryset.order_by().in_bulk(ids)
+        object_list = [posts[pk] for pk in ids if pk in posts]
+        page = KeysetPage(
+            object_list,
+            next_cursor=f'n{ids[-1]}' if ids and has_older else None,
+            previous_cursor=f'p{ids[0]}' if ids and has_newer else None,
+        )
+        return (None, page, object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        filters = self.get_facet_filters()
+        context['filter_query'] = urlencode([(k, v) for k, values in filters.items() for v in values])
+        result = getattr(self, 'facet_result', None)
+        if result is not None:
+            counts = facets.index.tag_counts(result)
+            top = sorted(counts, key=counts.get, reverse=True)[:self.facet_count_limit]
+            tags = Tag.objects.in_bulk(top)
+            context['facet_total'] = len(result)
+            context['tag_counts'] = [(tags[pk], counts[pk]) for pk in top if pk in tags]
+            counts = facets.index.author_counts(result)
+            top = sorted(counts, key=counts.get, reverse=True)[:self.facet_count_limit]
+            authors = User.objects.in_bulk(top)
+            context['author_counts'] = [(authors[pk], counts[pk]) for pk in top if pk in authors]
+        return context
+
+def post_validators(request, pk):
+    # (post updated_at, comment_count, latest comment updated_at) from one
+    # indexed lookup, for the ETag
+    if not hasattr(request, '_post_validators'):
+        latest_comment = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by('-updated_at').values('updated_at')[:1]
+        )
+        request._post_validators = (
+            Post.objects.filter(pk=pk)
+            .annotate(latest_comment=Subquery(latest_comment))
+            .values_list('updated_at', 'comment_count', 'latest_comment')
+            .first()
+        )
+    return request._post_validators
+
+
+def post_detail_cacheable(request):
+    # pending flash messages are per-visitor and consumed by the render
+    return 'messages' not in request.COOKIES
+
+
+def post_detail_etag(request, pk):
+    validators = post_validators(request, pk) if post_detail_cacheable(request) else None
+    if validators is None:
+        return None
+    updated_at, comment_count, latest_comment = validators
+    # the edit links and the comment form depend on who is looking;
+    # comment_count catches deleted comments, which leave no timestamp behind
+    stamps = '-'.join(str(ts.timestamp()) if ts else '0' for ts in (updated_at, latest_comment))
+    return f'{pk}-{stamps}-{comment_count}-{request.user.pk or 0}'
+
+
+# conditional GET: a revalidation is answered with a 304 from post_validators()
+# alone, without loading the post or rendering the page
+# (ETag only: a Last-Modified date can't see deleted comments or who is looking)
+@method_decorator(condition(etag_func=post_detail_etag), name='get')
 class PostDetailView(DetailView):
     model = Post
     template_name = 'blog/post_detail.html'  # templates/blog/post_detail.html
     context_object_name = 'post'
+    queryset = Post.objects.select_related('author')
+    comments_per_page = COMMENTS_PER_PAGE
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        post = self.get_object()
-        comments = post.comments.all()
-        context['comments'] = comments
+        # first page only; the rest is fetched from comment_list ("load more")
+        page = keyset_paginate(
+            self.object.comments.select_related('author'), self.comments_per_page, descending=False
+        )
+        context['comments'] = page.object_list
+        context['comments_page'] = page
+        context['post_id'] = self.object.pk
         context['comment_form'] = CommentForm()
         return context
-    
-    def post_list(request):
-        query = request.GET.get('q')
-        posts = Post.objects.all()
 
-        if query:
-            posts = posts.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(tags__name__icontains=query)
-        ).distinct()
 
-        return render(request, 'blog/post_list.html', {'posts': posts, 'query': query})
+def comment_list(request, pk):
+    # "load more" fragment: the next page of a post's comments after ?cursor=
+    page = keyset_paginate(
+        Comment.objects.filter(post_id=pk).select_related('author'),
+        COMMENTS_PER_PAGE,
+        request.GET.get('cursor'),
+        descending=False,
+    )
+    context = {'comments': page.object_list, 'comments_page': page, 'post_id': pk}
+    return render(request, 'blog/comment_list.html', context)
+
+
+def post_search(request):
+    # ranked full-text search; only the FTS index is scanned, see blog/search.py
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search_posts(query), 10)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'posts': page_obj.object_list,
+        'cards': render_cards(page_obj.object_list),
+        'query': query,
+        'page_obj': page_obj,
+        'paginator': paginator,
+        'is_paginated': page_obj.has_other_pages(),
+    }
+    return render(request, 'blog/post_list.html', context)
 
 class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
@@ -168,7 +310,7 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
         comment = self.get_object()
         return comment.author == self.request.user
 
-class TagPostListView(ListView):
+class TagPostListView(PostCardsMixin, KeysetPaginationMixin, ListView):
     model = Post
     template_name = 'blog/post_list.html'
     context_object_name = 'posts'
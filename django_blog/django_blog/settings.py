@@ -48,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -160,6 +161,13 @@ TEMPLATES = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Full-page cache for anonymous visitors (see blog/middleware.py)
+BLOG_PAGE_CACHE = {
+    'URL_NAMES': ['blog-home'],
+    'TIMEOUT': 60,         # seconds a page is served as fresh
+    'STALE_TIMEOUT': 300,  # then served stale while one request regenerates it
+}
+
 # Redirect to home URL after login (Default redirects to /accounts/profile/)
 LOGIN_REDIRECT_URL = 'profile'
 LOGIN_URL = 'login'
\ No newline at end of file